@@ -1,38 +1,69 @@
+import sys
 from queue import Queue
+from threading import Thread
+from time import perf_counter_ns
 from typing import Optional
 
 import pygame
+from pygame.event import Event
 
 from asset import AssetManager
 from config.app_config import APP_HEIGHT
 from config.app_config import APP_WIDTH
+from config.app_config import IDLE_MAX_WAIT
+from config.app_config import IDLE_SLEEP
 from config.app_config import KILLER_SUDOKU_PAGE
 from config.app_config import MAIN_MENU_PAGE
+from config.app_config import PROFILER_CSV
+from config.app_config import PROFILER_OVERLAY_INTERVAL
+from config.app_config import TARGET_FPS
 from delta_time import DeltaTime
 from events import AppEvent
 from events import ChangeThemeEvent
 from events import LaunchGameEvent
+from events import LoadFailedEvent
+from events import ResumeGameEvent
 from events import SetPageEvent
+from events import StoreReadyEvent
+from game_journal import GameJournal
+from game_journal import GameSnapshot
+from game_journal import SavedGame
+from layout import Pointer
 from page import Page
 from page import PageManager
 from page_killer_sudoku import KillerSudoku
 from page_main_menu import MainMenu
+from profiler import Profiler
+from profiler_overlay import ProfilerOverlay
 from puzzle_store import PuzzleStore
 from themes import AppTheme
 
+# posted by other threads so a main loop sleeping in event.wait picks up their app events
+WAKE_EVENT: int = pygame.event.custom_type()
+# time from start up, recorded while the profiler is enabled
+FIRST_FRAME_SECTION: str = "startup.first_frame"
+STORE_LOADED_SECTION: str = "startup.store_loaded"
+GAME_RESUMED_SECTION: str = "startup.game_resumed"
+
 
 class KillerSudokuApp:
 
     def __init__(self) -> None:
 
+        self._start_time: int = perf_counter_ns()
+        self._has_first_frame: bool = False
         self._app_events: Queue[AppEvent] = Queue()
         self._page_manager: PageManager = PageManager(self._app_events)
         self._delta_time: DeltaTime = DeltaTime()
+        self._frame_clock: pygame.time.Clock = pygame.time.Clock()
+        self._profiler_overlay: ProfilerOverlay = ProfilerOverlay()
         self._is_done: bool = False
 
         pygame.init()
-        PuzzleStore.load_puzzles()
         pygame.display.set_mode((APP_WIDTH, APP_HEIGHT))
+        # registered before the loader starts, which records into its section from its own thread
+        Profiler.get_section(STORE_LOADED_SECTION)
+        Thread(target=self._load_puzzles, name="puzzle-loader", daemon=True).start()
         AssetManager.load_icons()
 
         self._page_manager.add_page(MAIN_MENU_PAGE, MainMenu, AppTheme.default())
@@ -42,8 +73,10 @@ class KillerSudokuApp:
         self._page_manager.update_pages_theme(AppTheme.default())
 
     def play(self) -> None:
+        Pointer.update()
         while not self._is_done:
 
+            frame_start: int = perf_counter_ns()
             self._delta_time.set()
             self._parse_app_events()
 
@@ -52,16 +85,89 @@ class KillerSudokuApp:
 
             page.update(self._delta_time.get())
             page.display()
-
-            self._forward_game_events(page)
-
-    def _forward_game_events(self, page: Page) -> None:
-        for event in pygame.event.get():
+            if Profiler.enabled:
+                Profiler.record("frame", frame_start)
+
+            if self._profiler_overlay.is_shown:
+                pygame.display.update(self._profiler_overlay.render(self._delta_time.get(),
+                                                                    self._delta_time.get_fps()))
+
+            if not self._has_first_frame:
+                self._has_first_frame = True
+                if Profiler.enabled:
+                    Profiler.record(FIRST_FRAME_SECTION, self._start_time)
+
+            events: list[Event] = self._wait_for_events(page)
+            # read after the events are pumped, the position holds for these events and the next frame
+            Pointer.update()
+            self._forward_game_events(page, events)
+
+        killer_sudoku: Optional[Page] = self._page_manager.get_page(KILLER_SUDOKU_PAGE)
+        assert isinstance(killer_sudoku, KillerSudoku)
+        killer_sudoku.close()
+        if Profiler.has_samples():
+            Profiler.dump_csv(PROFILER_CSV)
+
+    def _wait_for_events(self, page: Page) -> list[Event]:
+        # frames are capped at TARGET_FPS, with nothing to do the loop sleeps until an event arrives
+        # or until the page needs its next frame, e.g. when the clock shows the next second
+        self._frame_clock.tick(TARGET_FPS)
+        if (events := pygame.event.get()) or not IDLE_SLEEP or not self._app_events.empty():
+            return events
+
+        timeout: Optional[float] = page.get_idle_timeout()
+        if self._profiler_overlay.is_shown:
+            timeout = PROFILER_OVERLAY_INTERVAL if timeout is None else min(timeout, PROFILER_OVERLAY_INTERVAL)
+
+        if timeout is not None and timeout <= 0:
+            return events
+
+        wait: float = IDLE_MAX_WAIT if timeout is None else min(timeout, IDLE_MAX_WAIT)
+        if (event := pygame.event.wait(max(1, int(wait * 1000)))).type == pygame.NOEVENT:
+            return events
+
+        return [event] + pygame.event.get()
+
+    def _forward_game_events(self, page: Page, events: list[Event]) -> None:
+        for event in events:
             if event.type == pygame.QUIT:
                 self._is_done = True
-            else:
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self._toggle_profiler(page)
+            elif event.type != WAKE_EVENT:
                 page.parse_event(event)
 
+    def _toggle_profiler(self, page: Page) -> None:
+        # samples are only taken while the overlay is shown, hiding it redraws the page underneath
+        self._profiler_overlay.toggle()
+        Profiler.enabled = self._profiler_overlay.is_shown
+        if not self._profiler_overlay.is_shown:
+            page.require_full_redraw = True
+
+    def _put_app_event(self, app_event: AppEvent) -> None:
+        self._app_events.put(app_event)
+        pygame.event.post(Event(WAKE_EVENT))
+
+    def _load_puzzles(self) -> None:
+        # nothing is left to wait for a failure on this thread, it is handed to the main loop instead
+        try:
+            PuzzleStore.load_puzzles(lambda difficulty: self._put_app_event(StoreReadyEvent(difficulty)))
+            if Profiler.enabled:
+                Profiler.record(STORE_LOADED_SECTION, self._start_time)
+
+            saved: Optional[SavedGame] = GameJournal.load()
+
+        except Exception as error:
+            self._put_app_event(LoadFailedEvent(error))
+            return
+
+        if saved is None:
+            return
+
+        snapshot: GameSnapshot = saved.snapshot
+        if (puzzle := PuzzleStore.get_puzzle(snapshot.volume, snapshot.book, snapshot.puzzle_id)) is not None:
+            self._put_app_event(ResumeGameEvent(puzzle, saved))
+
     def _parse_app_events(self) -> None:
         while not self._app_events.empty():
 
@@ -76,8 +182,26 @@ class KillerSudokuApp:
                 assert isinstance(page, KillerSudoku)
                 page.process_launch_game_event(app_event)
 
+            elif isinstance(app_event, ResumeGameEvent):
+                killer_sudoku: Optional[Page] = self._page_manager.get_page(KILLER_SUDOKU_PAGE)
+                assert isinstance(killer_sudoku, KillerSudoku)
+                if not killer_sudoku.has_game:
+                    self._page_manager.page = KILLER_SUDOKU_PAGE
+                    killer_sudoku.process_resume_game_event(app_event)
+                    if Profiler.enabled:
+                        Profiler.record(GAME_RESUMED_SECTION, self._start_time)
+
             elif isinstance(app_event, ChangeThemeEvent):
                 self._page_manager.update_pages_theme(app_event.theme)
 
+            elif isinstance(app_event, StoreReadyEvent):
+                main_menu: Optional[Page] = self._page_manager.get_page(MAIN_MENU_PAGE)
+                assert isinstance(main_menu, MainMenu)
+                main_menu.enable_difficulty(app_event.difficulty)
+
+            elif isinstance(app_event, LoadFailedEvent):
+                # the difficulties that were not ready stay disabled
+                print(f"loading the puzzles or the saved game failed: {app_event.error!r}", file=sys.stderr)
+
             else:
                 raise Exception(f"App Event: {app_event.type.name} not recognised")
@@ -1,7 +1,8 @@
-from itertools import product
 from pathlib import Path
+from typing import NamedTuple
 from typing import Optional
 
+from pygame import PixelArray
 from pygame import image
 from pygame import transform
 from pygame.color import Color
@@ -11,9 +12,19 @@ from pygame.surface import Surface
 from config.app_config import ICONS
 
 
+class IconKey(NamedTuple):
+    icon_name: str
+    foreground: tuple[int, int, int, int]
+    background: tuple[int, int, int, int]
+    size: Optional[tuple[float, float]]
+
+
 class AssetManager:
+    # icons are recoloured once per (icon, foreground, background, size). cached surfaces are shared, copy one
+    # before changing it.
 
     icons: dict[str, Surface] = {}
+    _recoloured: dict[IconKey, Surface] = {}
 
     @staticmethod
     def load_icons() -> None:
@@ -23,19 +34,24 @@ class AssetManager:
 
             AssetManager.icons[file.stem] = image.load(file.absolute())
 
+        AssetManager._recoloured.clear()
+
     @staticmethod
     def get_icon(icon_name: str, foreground: Color, background: Color, size: Optional[Vector2] = None) -> Surface:
-        assert (icon_surface := AssetManager.icons[icon_name]) is not None
+        key: IconKey = IconKey(icon_name, tuple(foreground), tuple(background), None if size is None else tuple(size))
+        if (icon := AssetManager._recoloured.get(key)) is not None:
+            return icon
 
-        if size is not None:
-            icon_surface = transform.scale(icon_surface, size)
+        assert (icon_surface := AssetManager.icons[icon_name]) is not None
 
-        original_color: Color = Color(0, 0, 0)
-        for index in product(range(icon_surface.get_width()), range(icon_surface.get_height())):
-            if icon_surface.get_at(index) == original_color:
-                icon_surface.set_at(index, foreground)
+        # the loaded icon has to stay black, it is recoloured again for every theme
+        icon_surface = icon_surface.copy() if size is None else transform.scale(icon_surface, size)
+        with PixelArray(icon_surface) as pixels:
+            pixels.replace(Color(0, 0, 0), foreground, distance=0)
 
-        icon: Surface = Surface(icon_surface.get_size())
+        icon = Surface(icon_surface.get_size())
         icon.fill(background)
         icon.blit(icon_surface, (0, 0))
+        icon = icon.convert()
+        AssetManager._recoloured[key] = icon
         return icon
@@ -0,0 +1,129 @@
+import json
+import os
+import sys
+from argparse import ArgumentParser
+from argparse import Namespace
+from itertools import chain
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+from typing import NamedTuple
+from typing import Optional
+
+from chunk_runner import iter_chunks
+from chunk_runner import map_chunks
+from chunk_runner import positive_int
+from killer_sudoku_solver import SolveResult
+from killer_sudoku_solver import solve_puzzle
+from profiler import get_percentile
+from puzzle_store import Puzzle
+from puzzle_store import PuzzleStore
+
+DEFAULT_CHUNK_SIZE: int = 64
+DEFAULT_OUTPUT: str = "data/solutions.jsonl"
+
+
+class BatchSummary(NamedTuple):
+    workers: int
+    puzzles: int
+    not_unique: int
+    seconds: float
+    median_ms: float
+    p95_ms: float
+    worst_ms: float
+
+    @property
+    def throughput(self) -> float:
+        return self.puzzles / self.seconds if self.seconds > 0 else 0.0
+
+
+def solve_chunk(puzzles: tuple[Puzzle, ...]) -> list[dict[str, Any]]:
+    results: list[dict[str, Any]] = []
+    for puzzle in puzzles:
+        start: float = perf_counter()
+        result: SolveResult = solve_puzzle(puzzle)
+        solve_ms: float = (perf_counter() - start) * 1000
+        solution: Optional[str] = None
+        if result.solution is not None:
+            solution = "".join(str(val) for val in chain.from_iterable(result.solution))
+
+        results.append({
+            "volume": puzzle.volume,
+            "book": puzzle.book,
+            "id": puzzle.id,
+            "diff": puzzle.diff.name,
+            "unique": result.solution_count == 1,
+            "solutions": result.solution_count,
+            "nodes": result.nodes,
+            "ms": round(solve_ms, 3),
+            "solution": solution,
+        })
+
+    return results
+
+
+def run_batch(workers: int, output: str, limit: Optional[int], chunk_size: int) -> BatchSummary:
+    puzzles: int = 0
+    not_unique: int = 0
+    solve_times: list[float] = []
+    start: float = perf_counter()
+    with open(output, "w") as file:
+        for results in map_chunks(solve_chunk, iter_chunks(limit, chunk_size), workers):
+            for result in results:
+                file.write(json.dumps(result) + "\n")
+                solve_times.append(result["ms"])
+                if not result["unique"]:
+                    not_unique += 1
+                    print(f"puzzle {result['volume']}-{result['book']}-{result['id']} has "
+                          f"{'no' if result['solutions'] == 0 else 'more than one'} solution", file=sys.stderr)
+
+            puzzles += len(results)
+            file.flush()
+
+    # the median alone hides the few puzzles that need a deep search
+    seconds: float = perf_counter() - start
+    solve_times = sorted(solve_times) or [0.0]
+    return BatchSummary(workers, puzzles, not_unique, seconds, get_percentile(solve_times, 50),
+                        get_percentile(solve_times, 95), solve_times[-1])
+
+
+def get_worker_output(output: str, workers: int) -> str:
+    # data/solutions.jsonl -> data/solutions.4-workers.jsonl, so comparing worker counts keeps every run
+    path: Path = Path(output)
+    return str(path.with_name(f"{path.stem}.{workers}-workers{path.suffix}"))
+
+
+def parse_args() -> Namespace:
+    parser: ArgumentParser = ArgumentParser(description="solve every puzzle in the store and check it is unique")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="json lines file the results are written to")
+    parser.add_argument("--workers", type=positive_int, nargs="+", default=[os.cpu_count() or 1],
+                        help="worker counts to run, more than one compares their throughput and writes one output "
+                             "file per count")
+    parser.add_argument("--chunk-size", type=positive_int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--limit", type=int, default=None, help="only solve the first LIMIT puzzles")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args: Namespace = parse_args()
+    PuzzleStore.load_puzzles()
+
+    summaries: list[BatchSummary] = []
+    for workers in args.workers:
+        output: str = args.output if len(args.workers) == 1 else get_worker_output(args.output, workers)
+        summary: BatchSummary = run_batch(workers, output, args.limit, args.chunk_size)
+        summaries.append(summary)
+        print(f"{summary.workers} workers: {summary.puzzles} puzzles in {summary.seconds:.2f}s, "
+              f"{summary.throughput:.1f} puzzles/s, {summary.throughput / summary.workers:.1f} puzzles/s per worker, "
+              f"solve time median {summary.median_ms:.2f} ms, p95 {summary.p95_ms:.2f} ms, "
+              f"worst {summary.worst_ms:.2f} ms")
+
+    if summaries[-1].not_unique > 0:
+        print(f"{summaries[-1].not_unique} of {summaries[-1].puzzles} puzzles are not unique", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from functools import cache
+from typing import NamedTuple
+
+from config.app_config import BOARD_SIZE
+
+# Digit sets are 9 bit masks, bit (digit - 1) is set when digit is part of the set.
+ALL_DIGITS: int = (1 << BOARD_SIZE) - 1
+MAX_CAGE_SUM: int = BOARD_SIZE * (BOARD_SIZE + 1) // 2
+
+
+class CageCombinations(NamedTuple):
+    combinations: tuple[int, ...]
+    union: int
+    intersection: int
+
+
+def _create_table() -> tuple[tuple[tuple[int, ...], ...], ...]:
+    table: list[list[list[int]]] = [[[] for _ in range(MAX_CAGE_SUM + 1)] for _ in range(BOARD_SIZE + 1)]
+    for digits in range(ALL_DIGITS + 1):
+        digit_sum: int = sum(digit + 1 for digit in range(BOARD_SIZE) if digits & (1 << digit))
+        table[digits.bit_count()][digit_sum].append(digits)
+
+    return tuple(tuple(tuple(sums) for sums in size) for size in table)
+
+
+# COMBINATIONS[size][sum] holds every digit set of that size adding up to sum
+COMBINATIONS: tuple[tuple[tuple[int, ...], ...], ...] = _create_table()
+NO_COMBINATIONS: CageCombinations = CageCombinations((), 0, 0)
+
+
+@cache
+def get_cage_combinations(cage_sum: int, size: int, excluded: int = 0) -> CageCombinations:
+    if not 0 <= size <= BOARD_SIZE or not 0 <= cage_sum <= MAX_CAGE_SUM:
+        return NO_COMBINATIONS
+
+    combinations: tuple[int, ...] = tuple(digits for digits in COMBINATIONS[size][cage_sum] if not digits & excluded)
+    if not combinations:
+        return NO_COMBINATIONS
+
+    union: int = 0
+    intersection: int = ALL_DIGITS
+    for digits in combinations:
+        union |= digits
+        intersection &= digits
+
+    return CageCombinations(combinations, union, intersection)
+
+
+def to_digits(mask: int) -> list[int]:
+    return [digit + 1 for digit in range(BOARD_SIZE) if mask & (1 << digit)]
@@ -0,0 +1,43 @@
+from argparse import ArgumentTypeError
+from collections import deque
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from itertools import batched
+from itertools import islice
+from typing import Optional
+
+from puzzle_store import Puzzle
+from puzzle_store import PuzzleStore
+
+# chunks submitted per worker ahead of the result being waited on, enough to keep every worker busy
+CHUNKS_PER_WORKER: int = 2
+
+
+def iter_chunks(limit: Optional[int], chunk_size: int) -> Iterator[tuple[Puzzle, ...]]:
+    return batched(islice(PuzzleStore.iter_puzzles(), limit), chunk_size)
+
+
+def map_chunks[T, R](func: Callable[[T], R], chunks: Iterable[T], workers: int) -> Iterator[R]:
+    # results come back in the order of the chunks like Executor.map, but Executor.map submits every chunk
+    # before it returns the first result. here only a window of chunks is decoded and in flight at a time
+    window: int = max(workers * CHUNKS_PER_WORKER, 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: deque[Future[R]] = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(func, chunk))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+
+
+def positive_int(value: str) -> int:
+    # argparse type for worker counts and chunk sizes
+    if (number := int(value)) < 1:
+        raise ArgumentTypeError(f"{value} is not a positive number")
+
+    return number
@@ -2,10 +2,30 @@ APP_WIDTH: int = 756
 APP_HEIGHT: int = 850
 TITLE_FONT_SIZE: int = 40
 HOVER_ALPHA: int = 70
+DISABLED_ALPHA: int = 90
 BOARD_SIZE: int = 9
 TITLE: str = "Killer Sudoku"
 JSON_PUZZLES: str = "data/puzzles.json"
+BINARY_PUZZLES: str = "data/puzzles.bin"
+PUZZLE_INDEX: str = "data/puzzles.idx"
+PUZZLE_CACHE_SIZE: int = 256
+GLYPH_CACHE_SIZE: int = 512
 DOUBLE_CLICK_DELAY: float = 0.5
+TARGET_FPS: int = 60
+IDLE_SLEEP: bool = True
+IDLE_MAX_WAIT: float = 1.0
+MAX_HISTORY_MOVES: int = 2000
+HISTORY_CHECKPOINT_INTERVAL: int = 32
+REPLAY_MOVES_PER_SECOND: float = 8
+JOURNAL_PATH: str = "data/journal.bin"
+JOURNAL_SNAPSHOT: str = "data/journal.snap"
+JOURNAL_FLUSH_INTERVAL: float = 0.25
+JOURNAL_COMPACT_RECORDS: int = 4096
+PROFILER_ENABLED: bool = False
+PROFILER_SAMPLES: int = 1024
+PROFILER_CSV: str = "data/profile.csv"
+PROFILER_OVERLAY_INTERVAL: float = 0.5
+PROFILER_FONT_SIZE: int = 14
 
 # Assets
 ICONS: str = r"assets\icons"
@@ -1,5 +1,8 @@
 SUM_FONT_SIZE: int = 15
 DIGIT_FONT_SIZE: int = 30
+BOARD_FONT_SIZE: int = 20
+CLOCK_FONT_SIZE: int = 40
+SELECTION_SUM_FONT_SIZE: int = 50
 TOP_BAR_PAD: int = 5
 CAGE_PAD: int = 8
 CELL_PAD: int = 1
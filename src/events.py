@@ -2,6 +2,7 @@ from abc import ABC
 from enum import Enum
 from enum import auto
 
+from game_journal import SavedGame
 from puzzle_store import Puzzle
 from puzzle_store import PuzzleDifficulty
 from themes import AppTheme
@@ -11,6 +12,9 @@ class AppEventType(Enum):
     SET_PAGE = auto()
     LAUNCH_GAME = auto()
     CHANGE_THEME = auto()
+    STORE_READY = auto()
+    RESUME_GAME = auto()
+    LOAD_FAILED = auto()
 
 
 class AppEvent(ABC):
@@ -38,3 +42,22 @@ class ChangeThemeEvent(AppEvent):
     def __init__(self, theme: AppTheme) -> None:
         super().__init__(AppEventType.CHANGE_THEME)
         self.theme: AppTheme = theme
+
+
+class StoreReadyEvent(AppEvent):
+    def __init__(self, difficulty: PuzzleDifficulty) -> None:
+        super().__init__(AppEventType.STORE_READY)
+        self.difficulty: PuzzleDifficulty = difficulty
+
+
+class ResumeGameEvent(AppEvent):
+    def __init__(self, puzzle: Puzzle, saved_game: SavedGame) -> None:
+        super().__init__(AppEventType.RESUME_GAME)
+        self.puzzle: Puzzle = puzzle
+        self.saved_game: SavedGame = saved_game
+
+
+class LoadFailedEvent(AppEvent):
+    def __init__(self, error: Exception) -> None:
+        super().__init__(AppEventType.LOAD_FAILED)
+        self.error: Exception = error
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from typing import NamedTuple
+from typing import Optional
+
+from pygame.color import Color
+from pygame.font import Font
+from pygame.font import SysFont
+from pygame.font import get_fonts
+from pygame.surface import Surface
+
+from config.app_config import GLYPH_CACHE_SIZE
+
+type RGBA = tuple[int, int, int, int]
+
+
+class GlyphKey(NamedTuple):
+    font_name: str
+    size: int
+    text: str
+    foreground: RGBA
+    background: Optional[RGBA]
+
+
+class FontRegistry:
+    # fonts are built once per (name, size), rendered text is kept in an lru cache. cached surfaces are shared,
+    # copy one before changing it.
+
+    _default_name: Optional[str] = None
+    _fonts: dict[tuple[str, int], Font] = {}
+    _glyphs: OrderedDict[GlyphKey, Surface] = OrderedDict()
+    font_builds: int = 0
+    glyph_hits: int = 0
+    glyph_misses: int = 0
+
+    @staticmethod
+    def get_default_name() -> str:
+        if FontRegistry._default_name is None:
+            FontRegistry._default_name = get_fonts()[0]
+
+        return FontRegistry._default_name
+
+    @staticmethod
+    def get_font(size: int, font_name: Optional[str] = None) -> Font:
+        key: tuple[str, int] = (font_name or FontRegistry.get_default_name(), size)
+        if (font := FontRegistry._fonts.get(key)) is None:
+            font = SysFont(*key)
+            FontRegistry._fonts[key] = font
+            FontRegistry.font_builds += 1
+
+        return font
+
+    @staticmethod
+    def render(text: str, size: int, foreground: Color, background: Optional[Color] = None,
+               font_name: Optional[str] = None) -> Surface:
+        key: GlyphKey = GlyphKey(font_name or FontRegistry.get_default_name(), size, text, tuple(foreground),
+                                 None if background is None else tuple(background))
+        glyphs: OrderedDict[GlyphKey, Surface] = FontRegistry._glyphs
+        if (glyph := glyphs.get(key)) is not None:
+            glyphs.move_to_end(key)
+            FontRegistry.glyph_hits += 1
+            return glyph
+
+        glyph = FontRegistry.get_font(size, key.font_name).render(text, True, foreground, background)
+        glyphs[key] = glyph
+        FontRegistry.glyph_misses += 1
+        if len(glyphs) > GLYPH_CACHE_SIZE:
+            glyphs.popitem(last=False)
+
+        return glyph
+
+    @staticmethod
+    def clear() -> None:
+        FontRegistry._fonts.clear()
+        FontRegistry._glyphs.clear()
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import os
+import sys
+from contextlib import suppress
+from enum import Enum
+from enum import IntEnum
+from enum import auto
+from queue import Queue
+from struct import Struct
+from struct import error as StructError
+from threading import Thread
+from time import sleep
+from typing import BinaryIO
+from typing import NamedTuple
+from typing import Optional
+
+from config.app_config import JOURNAL_COMPACT_RECORDS
+from config.app_config import JOURNAL_FLUSH_INTERVAL
+from config.app_config import JOURNAL_PATH
+from config.app_config import JOURNAL_SNAPSHOT
+from move_history import CellDelta
+from puzzle import PuzzleDifficulty
+
+# Snapshot layout:
+#   magic, version, generation, volume, book, id, difficulty, elapsed ms, board (81 bytes), pencil marks (81 u16)
+#
+# Journal layout:
+#   header  - magic, version, generation of the snapshot the records apply to
+#   records - fixed size, kind, cell, old value, new value, old marks, new marks, elapsed ms
+#
+# A move, an undo and a redo are each written as the deltas of the move, the kind of the last record says which
+# one it was. An undo or redo carries its move so it can be replayed past the start of the history a resumed game
+# has, which only holds the moves made since the snapshot.
+#
+# A new snapshot bumps the generation before the journal is truncated, a journal left over from an older
+# generation is ignored, so a crash in between never replays records twice. A torn record at the end of the
+# journal, a record with an unknown kind and everything after it, and the deltas of a move whose last delta never
+# made it to disk are dropped.
+#
+# A failed write is reported and the writer carries on, but the records that follow it are dropped until the next
+# snapshot, so the journal on disk never has a gap in the middle.
+SNAPSHOT_MAGIC: bytes = b"KSJS"
+JOURNAL_MAGIC: bytes = b"KSJN"
+JOURNAL_VERSION: int = 2
+
+_SNAPSHOT: Struct = Struct("<4sHIHHIBI81s162s")
+_JOURNAL_HEADER: Struct = Struct("<4sHI")
+_RECORD: Struct = Struct("<BBBBHHI")
+
+
+class RecordKind(IntEnum):
+    DELTA = 0
+    LAST_DELTA = 1
+    UNDO = 2
+    REDO = 3
+    TIME = 4
+
+
+class JournalCommand(Enum):
+    FINISH = auto()
+    CLOSE = auto()
+
+
+class GameSnapshot(NamedTuple):
+    generation: int
+    volume: int
+    book: int
+    puzzle_id: int
+    difficulty: PuzzleDifficulty
+    elapsed: float
+    board: bytes
+    marks: bytes
+
+
+class JournalOp(NamedTuple):
+    kind: RecordKind
+    deltas: list[CellDelta]
+
+
+class SavedGame(NamedTuple):
+    snapshot: GameSnapshot
+    ops: list[JournalOp]
+    elapsed: float
+
+
+class GameJournal:
+
+    def __init__(self, journal_path: str = JOURNAL_PATH, snapshot_path: str = JOURNAL_SNAPSHOT) -> None:
+        self._journal_path: str = journal_path
+        self._snapshot_path: str = snapshot_path
+        self._queue: Queue[bytes | GameSnapshot | JournalCommand] = Queue()
+        # carrying on from the generation on disk keeps a new game from matching a stale journal
+        self._generation: int = 0 if (snapshot := read_snapshot(snapshot_path)) is None else snapshot.generation
+        self._records: int = 0
+        self._is_open: bool = False
+        # only touched by the writer
+        self._has_failed: bool = False
+        self._writer: Thread = Thread(target=self._write_loop, name="journal-writer", daemon=True)
+        self._writer.start()
+
+    @property
+    def needs_compaction(self) -> bool:
+        return self._is_open and self._records >= JOURNAL_COMPACT_RECORDS
+
+    def write_snapshot(self, volume: int, book: int, puzzle_id: int, difficulty: PuzzleDifficulty, elapsed: float,
+                       board: bytes, marks: bytes) -> None:
+        self._generation = (self._generation + 1) & 0xFFFFFFFF
+        self._records = 0
+        self._is_open = True
+        self._queue.put(GameSnapshot(self._generation, volume, book, puzzle_id, difficulty, elapsed, board, marks))
+
+    def resume(self, saved: SavedGame) -> None:
+        # records of a resumed game are appended to the journal it was read from
+        self._generation = saved.snapshot.generation
+        self._records = len(saved.ops)
+        self._is_open = True
+
+    def record_move(self, deltas: list[CellDelta], elapsed: float) -> None:
+        self._record_deltas(RecordKind.LAST_DELTA, deltas, elapsed)
+
+    def record_undo(self, deltas: list[CellDelta], elapsed: float) -> None:
+        self._record_deltas(RecordKind.UNDO, deltas, elapsed)
+
+    def record_redo(self, deltas: list[CellDelta], elapsed: float) -> None:
+        self._record_deltas(RecordKind.REDO, deltas, elapsed)
+
+    def record_time(self, elapsed: float) -> None:
+        self._record(RecordKind.TIME, elapsed)
+
+    def finish_game(self) -> None:
+        self._is_open = False
+        self._queue.put(JournalCommand.FINISH)
+
+    def close(self) -> None:
+        self._queue.put(JournalCommand.CLOSE)
+        self._writer.join()
+
+    def _record_deltas(self, last_kind: RecordKind, deltas: list[CellDelta], elapsed: float) -> None:
+        if not self._is_open or not deltas:
+            return
+
+        elapsed_ms: int = _to_ms(elapsed)
+        records: bytearray = bytearray()
+        for index, (cell, old_val, new_val, old_marks, new_marks) in enumerate(deltas):
+            kind: RecordKind = last_kind if index == len(deltas) - 1 else RecordKind.DELTA
+            records += _RECORD.pack(kind, cell, old_val, new_val, old_marks, new_marks, elapsed_ms)
+
+        self._records += len(deltas)
+        self._queue.put(bytes(records))
+
+    def _record(self, kind: RecordKind, elapsed: float) -> None:
+        if not self._is_open:
+            return
+
+        self._records += 1
+        self._queue.put(_RECORD.pack(kind, 0, 0, 0, 0, 0, _to_ms(elapsed)))
+
+    def _write_loop(self) -> None:
+        journal: Optional[BinaryIO] = None
+        try:
+            while True:
+                # records arriving while the writer sleeps are written and synced to disk as one batch
+                batch: list[bytes | GameSnapshot | JournalCommand] = [self._queue.get()]
+                sleep(JOURNAL_FLUSH_INTERVAL)
+                while not self._queue.empty():
+                    batch.append(self._queue.get())
+
+                pending: bytearray = bytearray()
+                for item in batch:
+                    if isinstance(item, bytes):
+                        pending += item
+                        continue
+
+                    journal = self._write(journal, pending, item)
+                    pending.clear()
+                    if item is JournalCommand.CLOSE:
+                        return
+
+                journal = self._write(journal, pending, None)
+
+        finally:
+            if journal is not None:
+                journal.close()
+
+    def _write(self, journal: Optional[BinaryIO], records: bytearray,
+               item: Optional[GameSnapshot | JournalCommand]) -> Optional[BinaryIO]:
+        try:
+            journal = self._flush(journal, records)
+            if isinstance(item, GameSnapshot):
+                journal = self._compact(journal, item)
+                self._has_failed = False
+
+            elif item is JournalCommand.FINISH:
+                self._remove(journal)
+                journal = None
+
+            return journal
+
+        except OSError as error:
+            print(f"journal write failed, records are dropped until the next snapshot: {error}", file=sys.stderr)
+            if journal is not None:
+                with suppress(OSError):
+                    journal.close()
+
+            self._has_failed = True
+            return None
+
+    def _flush(self, journal: Optional[BinaryIO], records: bytearray) -> Optional[BinaryIO]:
+        if not records or self._has_failed:
+            return journal
+
+        if journal is None:
+            if not os.path.exists(self._journal_path):
+                print(f"journal {self._journal_path} is missing, records are dropped until the next snapshot",
+                      file=sys.stderr)
+                self._has_failed = True
+                return None
+
+            journal = open(self._journal_path, "ab")
+
+        journal.write(records)
+        journal.flush()
+        os.fsync(journal.fileno())
+        return journal
+
+    def _compact(self, journal: Optional[BinaryIO], snapshot: GameSnapshot) -> BinaryIO:
+        if journal is not None:
+            journal.close()
+
+        write_snapshot(snapshot, self._snapshot_path)
+        journal = open(self._journal_path, "wb")
+        journal.write(_JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, snapshot.generation))
+        journal.flush()
+        os.fsync(journal.fileno())
+        return journal
+
+    def _remove(self, journal: Optional[BinaryIO]) -> None:
+        if journal is not None:
+            journal.close()
+
+        for path in (self._snapshot_path, self._journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def load(journal_path: str = JOURNAL_PATH, snapshot_path: str = JOURNAL_SNAPSHOT) -> Optional[SavedGame]:
+        if (snapshot := read_snapshot(snapshot_path)) is None:
+            return None
+
+        ops: list[JournalOp] = []
+        elapsed_ms: int = _to_ms(snapshot.elapsed)
+        if os.path.exists(journal_path):
+            with open(journal_path, "rb") as file:
+                data: bytes = file.read()
+
+            if len(data) >= _JOURNAL_HEADER.size and \
+                    _JOURNAL_HEADER.unpack_from(data) == (JOURNAL_MAGIC, JOURNAL_VERSION, snapshot.generation):
+                record_count: int = (len(data) - _JOURNAL_HEADER.size) // _RECORD.size
+                records: bytes = data[_JOURNAL_HEADER.size:_JOURNAL_HEADER.size + (record_count * _RECORD.size)]
+                deltas: list[CellDelta] = []
+                for kind, *delta, record_ms in _RECORD.iter_unpack(records):
+                    if kind not in RecordKind:
+                        break
+
+                    if kind != RecordKind.TIME:
+                        deltas.append(CellDelta(*delta))
+                        if kind == RecordKind.DELTA:
+                            continue
+
+                        ops.append(JournalOp(RecordKind(kind), deltas))
+                        deltas = []
+
+                    elapsed_ms = max(elapsed_ms, record_ms)
+
+        return SavedGame(snapshot, ops, elapsed_ms / 1000)
+
+
+def write_snapshot(snapshot: GameSnapshot, snapshot_path: str) -> None:
+    partial_path: str = snapshot_path + ".partial"
+    with open(partial_path, "wb") as file:
+        file.write(_SNAPSHOT.pack(SNAPSHOT_MAGIC, JOURNAL_VERSION, snapshot.generation, snapshot.volume,
+                                  snapshot.book, snapshot.puzzle_id, snapshot.difficulty.value,
+                                  _to_ms(snapshot.elapsed), snapshot.board, snapshot.marks))
+        file.flush()
+        os.fsync(file.fileno())
+
+    os.replace(partial_path, snapshot_path)
+
+
+def read_snapshot(snapshot_path: str) -> Optional[GameSnapshot]:
+    if not os.path.exists(snapshot_path):
+        return None
+
+    with open(snapshot_path, "rb") as file:
+        data: bytes = file.read()
+
+    try:
+        magic, version, generation, volume, book, puzzle_id, difficulty, elapsed_ms, board, marks = \
+            _SNAPSHOT.unpack(data)
+        if magic != SNAPSHOT_MAGIC or version != JOURNAL_VERSION:
+            return None
+
+        return GameSnapshot(generation, volume, book, puzzle_id, PuzzleDifficulty(difficulty), elapsed_ms / 1000,
+                            board, marks)
+
+    except (StructError, ValueError):
+        return None
+
+
+def _to_ms(seconds: float) -> int:
+    return min(int(seconds * 1000), 0xFFFFFFFF)
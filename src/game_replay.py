@@ -0,0 +1,49 @@
+from config.app_config import REPLAY_MOVES_PER_SECOND
+from killer_sudoku_state import KillerSudokuState
+
+
+class GameReplay:
+    # steps the state back and forth through its move history, the live position is restored on stop
+
+    def __init__(self, state: KillerSudokuState, moves_per_second: float = REPLAY_MOVES_PER_SECOND) -> None:
+        self._state: KillerSudokuState = state
+        self._moves_per_second: float = moves_per_second
+        self._live_move: int = 0
+        self._position: float = 0
+        self.is_active: bool = False
+        self.is_playing: bool = False
+
+    def start(self) -> None:
+        self._live_move = self._state.move_number
+        self.seek(self._state.move_range[0])
+        self.is_active = True
+        self.is_playing = True
+
+    def stop(self) -> None:
+        if not self.is_active:
+            return
+
+        self._state.seek(self._live_move)
+        self.is_active = False
+        self.is_playing = False
+
+    def step(self, moves: int) -> None:
+        self.is_playing = False
+        self.seek(self._state.move_number + moves)
+
+    def seek(self, position: float) -> None:
+        first_move, last_move = self._state.move_range
+        self._position = min(max(position, first_move), last_move)
+        self._state.seek(int(self._position))
+
+    def update(self, delta_time: float) -> bool:
+        # true when the board changed and has to be drawn again
+        if not self.is_playing:
+            return False
+
+        move_number: int = self._state.move_number
+        self.seek(self._position + (delta_time * self._moves_per_second))
+        if self._position >= self._state.move_range[1]:
+            self.is_playing = False
+
+        return self._state.move_number != move_number
@@ -9,28 +9,35 @@ from typing import override
 from pygame import BUTTON_LEFT
 from pygame import Color
 from pygame import K_LCTRL
+from pygame import SRCALPHA
 from pygame import MOUSEBUTTONDOWN
 from pygame import MOUSEBUTTONUP
 from pygame import draw
 from pygame import key
-from pygame import mouse
 from pygame.event import Event
-from pygame.font import Font
-from pygame.font import SysFont
-from pygame.font import get_fonts
 from pygame.math import Vector2
 from pygame.rect import Rect
 from pygame.surface import Surface
 
 from config.app_config import BOARD_SIZE
+from config.game_config import BOARD_FONT_SIZE
 from config.game_config import CAGE_PAD
 from config.game_config import CELL_PAD
 from config.game_config import SUM_FONT_SIZE
 from events import AppEvent
+from fonts import FontRegistry
 from gui_component import GuiComponent
 from killer_sudoku_state import KillerSudokuState
+from layout import GridIndex
+from layout import Pointer
+from profiler import timed
+from puzzle import CELL_COUNT
+from puzzle import NO_CAGE
+from puzzle import Puzzle
 from region import Region
 from themes import AppTheme
+from themes import ThemeCache
+from themes import ThemeKey
 
 
 class Direction(Enum):
@@ -92,14 +99,26 @@ class Selection:
         if len(self.selected) == 0:
             return selection_sum
 
-        selected_index: set[tuple[int, int]] = {(cell.row, cell.col) for cell in self.selected}
-        for val, cage in state.puzzle.cages:
-            if len(selected_index.intersection(cage)) == len(cage):
-                selection_sum += val
-                selected_index -= set(cage)
+        puzzle: Puzzle = state.puzzle
+        selected_mask: int = 0
+        for cell in self.selected:
+            selected_mask |= 1 << ((cell.row * BOARD_SIZE) + cell.col)
 
-        for row, col in selected_index:
-            cell_val: int = state[row][col]
+        selected_cages: set[int] = set()
+        remaining: list[Cell] = []
+        for cell in self.selected:
+            cage_index: int = puzzle.get_cage_index(cell.row, cell.col)
+            if cage_index != NO_CAGE and selected_mask & puzzle.cage_masks[cage_index] == puzzle.cage_masks[cage_index]:
+                selected_cages.add(cage_index)
+
+            else:
+                remaining.append(cell)
+
+        for cage_index in selected_cages:
+            selection_sum += puzzle.cages[cage_index][0]
+
+        for cell in remaining:
+            cell_val: int = state[cell.row][cell.col]
             if cell_val == 0:
                 return 0
 
@@ -111,26 +130,24 @@ class Selection:
 
 class PencilMarksDisplay:
 
-    def __init__(self, cell_size: Rect, theme: AppTheme, font_name: str) -> None:
+    def __init__(self, cell_size: Rect, theme: AppTheme) -> None:
         self.surface: Surface = Surface(Vector2(cell_size.size) - Vector2((CAGE_PAD + 2) * 2))
-        self.regions: list[Region] = self._create_regions(theme)
-
-        self._font_name: str = font_name
+        self._region_cache: ThemeCache[list[Region]] = ThemeCache(self._create_regions)
+        self.regions: list[Region] = self._region_cache.get(theme)
+        # the font size only depends on the size of the regions, it stays the same for every theme
         self._font_size: int = self._calculate_font_size()
 
     def redraw(self, theme: AppTheme) -> None:
-        self.regions = self._create_regions(theme)
-        self._font_size = self._calculate_font_size()
+        self.regions = self._region_cache.get(theme)
 
-    def get_font(self) -> Font:
-        return SysFont(self._font_name, self._font_size)
+    def render_mark(self, mark: int, foreground: Color, background: Color) -> Surface:
+        return FontRegistry.render(str(mark), self._font_size, foreground, background)
 
     def _calculate_font_size(self) -> int:
         font_size: int = 1
         bounding_box: Rect = self.regions[0].surface.get_rect()
         while True:
-            font: Font = SysFont(self._font_name, font_size)
-            size: Vector2 = Vector2(font.size("0"))
+            size: Vector2 = Vector2(FontRegistry.get_font(font_size).size("0"))
             if size.x > bounding_box.width:
                 return font_size - 1
 
@@ -166,46 +183,70 @@ class PencilMarksDisplay:
 
 class BoardGui(GuiComponent):
     @override
-    def render(self) -> None:
-        for cell in chain.from_iterable(self._cells):
-            cell.region.render()
-
+    @timed("BoardGui.render")
+    def render(self) -> list[Rect]:
+        changed: set[Cell] = self.selection.selected ^ self._rendered_selection
         if self._require_redraw:
-            self._clear_cells()
-            self._draw_pencil_marks()
-            self._draw_board_vals()
-            self._draw_cages()
+            self._state.take_changed_cells()
+            self._update_cage_layer()
+            self._highlight = self._get_highlight()
+            for cell in chain.from_iterable(self._cells):
+                self._draw_cell(cell)
+
             self._require_redraw = False
+            self._is_dirty = True
+
+        elif redrawn := self._get_changed_cells(len(changed) > 0):
+            for cell in redrawn:
+                self._draw_cell(cell)
 
-        for cell in self.selection.selected:
-            cell.region.render_hover()
+            changed |= redrawn
 
-        self.parent.surface.blit(self._surface,
-                                 self._surface.get_rect(center=self.parent.surface.get_rect().center))
+        if not self._is_dirty and not changed:
+            return []
+
+        for cell in chain.from_iterable(self._cells) if self._is_dirty else changed:
+            cell.region.render()
+            if cell in self.selection.selected:
+                cell.region.render_hover()
+
+        self._rendered_selection = set(self.selection.selected)
+        board_pos: Rect = self._surface.get_rect(center=self.parent.surface.get_rect().center)
+        self.parent.surface.blit(self._surface, board_pos)
         self.parent.render()
 
+        if self._is_dirty:
+            self._is_dirty = False
+            return [self.parent.placement]
+
+        return [self.to_screen(cell.region.placement.move(board_pos.topleft)) for cell in changed]
+
     @override
+    @timed("BoardGui.update")
     def update(self, delta_time: float) -> None:
         if not self.selection.selecting:
             return
 
-        for cell in chain.from_iterable(self._cells):
-            if cell.region.is_collided(self._get_collision_offset()):
-                self.selection.add_cell(cell)
+        offset: Vector2 = self._get_collision_offset()
+        x, y = Pointer.pos
+        if (index := self._cell_index.get_cell(x - offset.x, y - offset.y)) is not None:
+            row, col = index
+            self.selection.add_cell(self._cells[row][col])
 
     @override
     def update_theme(self) -> None:
         self.parent.surface.fill(self._theme.background)
         self._surface.fill(self._theme.foreground)
         for cell in chain.from_iterable(self._cells):
-            cell.region.surface.fill(self._theme.background)
             cell.region.set_hover_color(self._theme.foreground)
 
+        # the cells are cleared and drawn in the new colours the next time the board is shown
         self._pencil_marks.redraw(self._theme)
+        self._require_redraw = True
 
     @override
     def parse_event(self, game_event: Event, events: Queue[AppEvent]) -> None:
-        if not self.parent.placement.collidepoint(mouse.get_pos()):
+        if not self.parent.placement.collidepoint(Pointer.pos):
             self.selection.selecting = False
             return
 
@@ -215,7 +256,6 @@ class BoardGui(GuiComponent):
 
         elif game_event.type == MOUSEBUTTONDOWN:
             if game_event.button == BUTTON_LEFT:
-                self._require_redraw = True
                 if len(self.selection.selected) > 0 and not key.get_pressed()[K_LCTRL]:
                     self.selection.clear()
 
@@ -226,10 +266,20 @@ class BoardGui(GuiComponent):
         self._state: KillerSudokuState = state
         self._cells: list[list[Cell]] = []
         self._surface: Surface = self._create_board_surface()
+        self._cell_index: GridIndex = self._create_cell_index()
         self._require_redraw: bool = True
-        self._pencil_marks: PencilMarksDisplay = PencilMarksDisplay(self._cells[0][0].region.surface.get_rect(), theme,
-                                                                    get_fonts()[0])
+        self._rendered_selection: set[Cell] = set()
+        self._highlight: int = 0
+        self._pencil_marks: PencilMarksDisplay = PencilMarksDisplay(self._cells[0][0].region.surface.get_rect(), theme)
         self.selection: Selection = Selection()
+        # cage outlines and sums are drawn once per puzzle and theme, one layer in each colour a cage can have.
+        # _cage_layer holds every cage in the colour it was last drawn in, only cages that became valid or
+        # invalid since then are copied over from the other layer
+        self._cage_layer: Surface = self._create_cage_layer()
+        self._cage_colors: ThemeCache[tuple[Surface, Surface]] = ThemeCache(self._draw_cage_colors)
+        self._cage_layer_puzzle: Optional[Puzzle] = None
+        self._cage_layer_theme: Optional[ThemeKey] = None
+        self._cage_validity: list[bool] = []
 
     @property
     def require_redraw(self) -> bool:
@@ -270,6 +320,11 @@ class BoardGui(GuiComponent):
         self._cells = cells
         return board
 
+    def _create_cell_index(self) -> GridIndex:
+        # same layout as _create_board_surface, every third cell is followed by the wider gap between boxes
+        cell_w, cell_h = self._cells[0][0].region.surface.get_size()
+        return GridIndex((cell_w, cell_h), (BOARD_SIZE, BOARD_SIZE), CELL_PAD, CELL_PAD, 3, CELL_PAD * 2)
+
     @cache
     def _get_neighbours(self, row: int, col: int) -> set[Direction]:
         neighbours: set[Direction] = set()
@@ -292,72 +347,112 @@ class BoardGui(GuiComponent):
 
         return neighbours
 
-    def _get_present_neighbours(self, row: int, col: int, present_cells: set[tuple[int, int]]) -> set[Direction]:
+    def _get_present_neighbours(self, row: int, col: int, cage_map: bytes) -> set[Direction]:
+        # neighbours in the same cage as the cell
         neighbours: set[Direction] = self._get_neighbours(row, col)
         present: set[Direction] = set()
+        cage_index: int = cage_map[(row * BOARD_SIZE) + col]
         for neighbour in neighbours:
             index: Vector2 = Vector2(row, col) + neighbour.get()
-            if (index.x, index.y) in present_cells:
+            if cage_map[(int(index.x) * BOARD_SIZE) + int(index.y)] == cage_index:
                 present.add(neighbour)
 
         return present
 
-    def _draw_pencil_marks(self) -> None:
-        def get_font_color(pencil_mark: int, row: int, col: int) -> Color:
-            if not self._state.is_mark_valid(pencil_mark, row, col):
+    def _draw_cell(self, cell: Cell) -> None:
+        cell.region.surface.fill(self._theme.background)
+        self._draw_pencil_marks(cell)
+        self._draw_board_val(cell)
+        cell.region.surface.blit(self._cage_layer, (0, 0), self._get_layer_rect(cell.row, cell.col))
+
+    def _draw_pencil_marks(self, cell: Cell) -> None:
+        def get_font_color(pencil_mark: int) -> Color:
+            if not self._state.is_mark_valid(pencil_mark, cell.row, cell.col):
                 return self._theme.invalid
 
-            if (selected := self.selection.get_single_selection()) is not None:
-                selected_val: int = self._state[selected.row][selected.col]
-                if selected_val in self._state.get_pencil_markings(row, col) and selected_val == pencil_mark:
-                    return self._theme.highlight
+            if pencil_mark == self._highlight:
+                return self._theme.highlight
 
             return self._theme.foreground
 
-        for cell in chain.from_iterable(self._cells):
-            self._pencil_marks.surface.fill(self._theme.background)
+        if self._state[cell.row][cell.col] != 0:
+            return
 
-            if self._state[cell.row][cell.col] != 0:
-                continue
+        if not (markings := self._state.get_pencil_markings(cell.row, cell.col)):
+            return
 
-            if not (markings := self._state.get_pencil_markings(cell.row, cell.col)):
+        self._pencil_marks.surface.fill(self._theme.background)
+        for region, mark in zip(self._pencil_marks.regions, markings):
+            val: Surface = self._pencil_marks.render_mark(mark, get_font_color(mark), self._theme.background)
+            region.surface.blit(val, val.get_rect(center=region.surface.get_rect().center))
+            region.render()
+
+        cell.region.surface.blit(self._pencil_marks.surface,
+                                 self._pencil_marks.surface.get_rect(center=cell.region.surface.get_rect().center))
+
+    def _create_cage_layer(self) -> Surface:
+        cell_w, cell_h = self._cells[0][0].region.surface.get_size()
+        return Surface((cell_w * BOARD_SIZE, cell_h * BOARD_SIZE), SRCALPHA)
+
+    def _get_layer_rect(self, row: int, col: int) -> Rect:
+        cell_w, cell_h = self._cells[0][0].region.surface.get_size()
+        return Rect(col * cell_w, row * cell_h, cell_w, cell_h)
+
+    def _update_cage_layer(self) -> set[int]:
+        # returns the cells whose cage outline changed colour
+        puzzle: Puzzle = self._state.puzzle
+        changed: set[int] = set()
+        if self._cage_layer_puzzle is not puzzle:
+            self._cage_colors.clear()
+            self._cage_layer_theme = None
+
+        cage_colors: tuple[Surface, Surface] = self._cage_colors.get(self._theme)
+        if self._cage_layer_puzzle is not puzzle or self._cage_layer_theme != self._theme.key:
+            self._cage_layer.fill((0, 0, 0, 0))
+            self._cage_layer.blit(cage_colors[0], (0, 0))
+            self._cage_layer_puzzle = puzzle
+            self._cage_layer_theme = self._theme.key
+            self._cage_validity = [True] * len(puzzle.cages)
+            changed.update(range(CELL_COUNT))
+
+        for cage_index, (_, cells) in enumerate(puzzle.cages):
+            is_valid: bool = self._state.is_cage_index_valid(cage_index)
+            if is_valid == self._cage_validity[cage_index]:
                 continue
 
-            for region, mark in zip(self._pencil_marks.regions, markings):
-                val: Surface = self._pencil_marks.get_font().render(str(mark), True,
-                                                                    get_font_color(mark, cell.row, cell.col),
-                                                                    self._theme.background)
-                region.surface.blit(val, val.get_rect(center=region.surface.get_rect().center))
-                region.render()
-
-            cell.region.surface.blit(self._pencil_marks.surface,
-                                     self._pencil_marks.surface.get_rect(center=cell.region.surface.get_rect().center))
+            colored_layer: Surface = cage_colors[0 if is_valid else 1]
+            for row, col in cells:
+                layer_rect: Rect = self._get_layer_rect(row, col)
+                self._cage_layer.fill((0, 0, 0, 0), layer_rect)
+                self._cage_layer.blit(colored_layer, layer_rect, layer_rect)
+                changed.add((row * BOARD_SIZE) + col)
 
-    def _draw_cages(self) -> None:
-        def get_cage_color(total_sum: int, cage_cells: list[tuple[int, int]]) -> Color:
-            if not self._state.is_cage_valid(total_sum, cage_cells):
-                return self._theme.invalid
+            self._cage_validity[cage_index] = is_valid
 
-            return self._theme.foreground
+        return changed
 
-        font: Font = SysFont(get_fonts()[0], SUM_FONT_SIZE)
-        for cage_sum, cells in self._state.puzzle.cages:
-            present_cells: set[tuple[int, int]] = set(cells)
-            sum_row, sum_col = cells[-1]
-            sum_cell: Cell = self._cells[sum_row][sum_col]
+    def _draw_cage_colors(self, theme: AppTheme) -> tuple[Surface, Surface]:
+        valid_layer: Surface = self._create_cage_layer()
+        invalid_layer: Surface = self._create_cage_layer()
+        self._draw_cage_layer(valid_layer, theme.foreground, theme.background)
+        self._draw_cage_layer(invalid_layer, theme.invalid, theme.background)
+        return valid_layer, invalid_layer
 
-            line_color: Color = get_cage_color(cage_sum, cells)
-            sum_surface: Surface = font.render(str(cage_sum), True, line_color, self._theme.background)
+    def _draw_cage_layer(self, layer: Surface, line_color: Color, background: Color) -> None:
+        puzzle: Puzzle = self._state.puzzle
+        for cage_sum, cells in puzzle.cages:
             for row, col in cells:
-                neighbours: set[Direction] = self._get_present_neighbours(row, col, present_cells)
-                self._draw_cage_side(row, col, neighbours, line_color)
-                self._draw_cage_corner(row, col, neighbours, cells, line_color)
+                cell_surface: Surface = layer.subsurface(self._get_layer_rect(row, col))
+                neighbours: set[Direction] = self._get_present_neighbours(row, col, puzzle.cage_map)
+                self._draw_cage_side(cell_surface, neighbours, line_color)
+                self._draw_cage_corner(cell_surface, row, col, neighbours, puzzle.cage_map, line_color)
 
-            sum_cell.region.surface.blit(sum_surface, sum_surface.get_rect(center=(CAGE_PAD, CAGE_PAD)))
+            sum_surface: Surface = FontRegistry.render(str(cage_sum), SUM_FONT_SIZE, line_color, background)
+            sum_cell: Surface = layer.subsurface(self._get_layer_rect(*cells[-1]))
+            sum_cell.blit(sum_surface, sum_surface.get_rect(center=(CAGE_PAD, CAGE_PAD)))
 
-    def _draw_cage_corner(self, row: int, col: int, neighbours: set[Direction], cage: list[tuple[int, int]],
-                          line_color: Color) -> None:
-        cell_surface: Surface = self._cells[row][col].region.surface
+    def _draw_cage_corner(self, cell_surface: Surface, row: int, col: int, neighbours: set[Direction],
+                          cage_map: bytes, line_color: Color) -> None:
         cell_size: Vector2 = Vector2(cell_surface.get_size())
         cell_w, cell_h = cell_surface.get_size()
 
@@ -370,7 +465,7 @@ class BoardGui(GuiComponent):
             if extra_col >= len(self._cells[0]) or extra_col < 0:
                 return False
 
-            return (extra_row, extra_col) in cage
+            return cage_map[(extra_row * BOARD_SIZE) + extra_col] == cage_map[(row * BOARD_SIZE) + col]
 
         is_left_present: bool = Direction.LEFT in neighbours
         is_right_present: bool = Direction.RIGHT in neighbours
@@ -405,8 +500,7 @@ class BoardGui(GuiComponent):
             draw.line(cell_surface, line_color,
                       Vector2(cell_w - CAGE_PAD, CAGE_PAD), Vector2(cell_w, CAGE_PAD))
 
-    def _draw_cage_side(self, row: int, col: int, excluded_directions: set[Direction], line_color: Color) -> None:
-        cell_surface: Surface = self._cells[row][col].region.surface
+    def _draw_cage_side(self, cell_surface: Surface, excluded_directions: set[Direction], line_color: Color) -> None:
         is_left_present: bool = Direction.LEFT in excluded_directions
         is_right_present: bool = Direction.RIGHT in excluded_directions
         is_up_present: bool = Direction.UP in excluded_directions
@@ -493,27 +587,44 @@ class BoardGui(GuiComponent):
         return Vector2(self.parent.placement.topleft) + \
             Vector2(self._surface.get_rect(center=self.parent.surface.get_rect().center).topleft)
 
-    def _clear_cells(self) -> None:
-        for cell in chain.from_iterable(self._cells):
-            cell.region.surface.fill(self._theme.background)
+    def _draw_board_val(self, cell: Cell) -> None:
+        if (val := self._state[cell.row][cell.col]) == 0:
+            return
 
-    def _draw_board_vals(self) -> None:
-        def get_font_color(row: int, col: int) -> Color:
-            if not self._state.is_value_valid(row, col):
-                return self._theme.invalid
+        font_color: Color = self._theme.foreground
+        if not self._state.is_value_valid(cell.row, cell.col):
+            font_color = self._theme.invalid
 
-            if (selected := self.selection.get_single_selection()) is not None and \
-                    self._state[row][col] == self._state[selected.row][selected.col]:
-                return self._theme.highlight
+        elif val == self._highlight:
+            font_color = self._theme.highlight
 
-            return self._theme.foreground
+        dig: Surface = FontRegistry.render(str(val), BOARD_FONT_SIZE, font_color, self._theme.background)
+        cell.region.surface.blit(dig, dig.get_rect(center=cell.region.surface.get_rect().center))
 
-        font: Font = SysFont(get_fonts()[0], 20)
-        for cell in chain.from_iterable(self._cells):
-            if (val := self._state[cell.row][cell.col]) == 0:
-                continue
+    def _get_highlight(self) -> int:
+        # values and marks of the digit in the selected cell are highlighted, 0 highlights nothing
+        if (selected := self.selection.get_single_selection()) is None:
+            return 0
+
+        return self._state[selected.row][selected.col]
+
+    def _get_digit_cells(self, digit: int) -> set[int]:
+        if digit == 0:
+            return set()
+
+        mark: int = 1 << (digit - 1)
+        return {cell for cell in range(CELL_COUNT)
+                if self._state.get_value(cell) == digit or self._state.get_mark_mask(cell) & mark}
+
+    def _get_changed_cells(self, is_selection_changed: bool) -> set[Cell]:
+        # cells the state changed, cells of cages that changed colour and cells whose highlight changed
+        changed: set[int] = self._state.take_changed_cells()
+        if changed:
+            changed |= self._update_cage_layer()
 
-            dig: Surface = font.render(str(val), True, get_font_color(cell.row, cell.col),
-                                       self._theme.background)
+        if changed or is_selection_changed:
+            if (highlight := self._get_highlight()) != self._highlight:
+                changed |= self._get_digit_cells(self._highlight) | self._get_digit_cells(highlight)
+                self._highlight = highlight
 
-            cell.region.surface.blit(dig, dig.get_rect(center=cell.region.surface.get_rect().center))
+        return {self._cells[cell // BOARD_SIZE][cell % BOARD_SIZE] for cell in changed}
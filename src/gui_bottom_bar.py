@@ -5,11 +5,13 @@ from pygame import BUTTON_LEFT
 from pygame import MOUSEBUTTONUP
 from pygame.event import Event
 from pygame.math import Vector2
+from pygame.rect import Rect
 
 from events import AppEvent
 from gui_component import GuiComponent
 from gui_digits import Digits
 from gui_tools import Tools
+from profiler import timed
 from region import PartitionDirection
 from region import Region
 from themes import AppTheme
@@ -18,12 +20,22 @@ from themes import AppTheme
 class BottomBar(GuiComponent):
 
     @override
-    def render(self) -> None:
-        self.tools.render(self.get_collision_offset(), self._theme)
-        self.digits.render(self.get_collision_offset())
+    @timed("BottomBar.render")
+    def render(self) -> list[Rect]:
+        changed: list[Rect] = self.tools.render(self.get_collision_offset(), self._theme, self._is_dirty) + \
+            self.digits.render(self.get_collision_offset(), self._is_dirty)
+        if not changed:
+            return []
+
         self.parent.render()
+        if self._is_dirty:
+            self._is_dirty = False
+            return [self.parent.placement]
+
+        return [self.to_screen(rect) for rect in changed]
 
     @override
+    @timed("BottomBar.update")
     def update(self, delta_time: float) -> None:
         pass
 
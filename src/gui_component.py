@@ -2,6 +2,7 @@ from abc import abstractmethod
 from queue import Queue
 
 from pygame.event import Event
+from pygame.rect import Rect
 
 from events import AppEvent
 from region import Region
@@ -10,7 +11,8 @@ from themes import AppTheme
 
 class GuiComponent:
     @abstractmethod
-    def render(self) -> None:
+    def render(self) -> list[Rect]:
+        # screen rects that changed since the last render, everything when the component is dirty
         pass
 
     @abstractmethod
@@ -28,6 +30,7 @@ class GuiComponent:
     def __init__(self, parent: Region, theme: AppTheme) -> None:
         self.parent: Region = parent
         self._theme: AppTheme = theme
+        self._is_dirty: bool = True
 
     @property
     def theme(self) -> AppTheme:
@@ -41,3 +44,10 @@ class GuiComponent:
     def theme(self, new_theme: AppTheme) -> None:
         self._theme = new_theme
         self.update_theme()
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        self._is_dirty = True
+
+    def to_screen(self, rect: Rect) -> Rect:
+        return rect.move(self.parent.placement.topleft)
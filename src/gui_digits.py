@@ -1,17 +1,18 @@
-from itertools import chain
 from typing import Optional
 
-from pygame.font import Font
-from pygame.font import SysFont
-from pygame.font import get_fonts
 from pygame.math import Vector2
+from pygame.rect import Rect
 from pygame.surface import Surface
 
 from config.game_config import DIGIT_FONT_SIZE
+from fonts import FontRegistry
 from killer_sudoku_state import KillerSudokuState
+from layout import GridIndex
+from layout import Pointer
 from region import PartitionDirection
 from region import Region
 from themes import AppTheme
+from themes import ThemeCache
 
 
 class Digit:
@@ -20,7 +21,10 @@ class Digit:
         self._filled: int = 0
         self._val: int = val
         self.is_complete: bool = False
+        self.is_dirty: bool = True
         self.region: Region = digit_region
+        # the face with the value and the empty face shown once every cell of the digit is filled
+        self._faces: ThemeCache[tuple[Surface, Surface]] = ThemeCache(self._create_faces)
 
     @property
     def val(self) -> int:
@@ -35,21 +39,23 @@ class Digit:
         del self._val
 
     def draw_val(self, theme: AppTheme) -> None:
-        font: Font = SysFont(get_fonts()[0], DIGIT_FONT_SIZE)
-        dig: Surface = font.render(str(self._val), True, theme.foreground,
-                                   theme.background)
-        self.region.surface.blit(dig, dig.get_rect(center=self.region.surface.get_rect().center))
+        self.region.surface = self._faces.get(theme)[self.is_complete]
+        self.is_dirty = True
 
-    def update_is_complete(self, board_val_freq: dict[int, int], theme: AppTheme) -> None:
-        if (freq := board_val_freq.get(self._val)) is None:
+    def update_is_complete(self, is_complete: bool, theme: AppTheme) -> None:
+        if is_complete == self.is_complete:
             return
 
-        self.is_complete = freq >= 9
-        if self.is_complete:
-            self.region.surface.fill(theme.background)
+        self.is_complete = is_complete
+        self.draw_val(theme)
 
-        else:
-            self.draw_val(theme)
+    def _create_faces(self, theme: AppTheme) -> tuple[Surface, Surface]:
+        face: Surface = Surface(self.region.surface.get_size())
+        face.fill(theme.background)
+        empty_face: Surface = face.copy()
+        dig: Surface = FontRegistry.render(str(self._val), DIGIT_FONT_SIZE, theme.foreground, theme.background)
+        face.blit(dig, dig.get_rect(center=face.get_rect().center))
+        return face, empty_face
 
 
 class Digits:
@@ -57,6 +63,8 @@ class Digits:
     def __init__(self, parent: Region) -> None:
         self.parent: Region = parent
         self.digits: list[Digit] = self._create_digits_input()
+        self._digit_index: GridIndex = GridIndex(self.digits[0].region.surface.get_size(), (1, len(self.digits)))
+        self._hovered: Optional[Digit] = None
 
     def _create_digits_input(self) -> list[Digit]:
         digits: list[Digit] = []
@@ -66,22 +74,33 @@ class Digits:
 
         return digits
 
-    def render(self, offset: Vector2) -> None:
+    def render(self, offset: Vector2, is_dirty: bool) -> list[Rect]:
+        # returns the rects of the digits that were drawn again, relative to the parent of the digits
+        hovered: Optional[Digit] = self.get_collided(offset)
+        if hovered is not None and hovered.is_complete:
+            hovered = None
+
+        changed: list[Rect] = []
         for digit in self.digits:
-            digit.region.render()
+            if not is_dirty and not digit.is_dirty and (digit is hovered) == (digit is self._hovered):
+                continue
 
-        if (digit := self.get_collided(offset)) is not None:
-            if not digit.is_complete:
+            digit.region.render()
+            if digit is hovered:
                 digit.region.render_hover()
 
-        self.parent.render()
+            digit.is_dirty = False
+            changed.append(digit.region.placement.move(self.parent.placement.topleft))
 
-    def update_digits(self, state: KillerSudokuState, theme: AppTheme) -> None:
-        board_val_freq: dict[int, int] = {dig.val: list(chain.from_iterable(state.get_state())).count(dig.val) for dig
-                                          in self.digits}
+        self._hovered = hovered
+        if changed:
+            self.parent.render()
 
+        return changed
+
+    def update_digits(self, state: KillerSudokuState, theme: AppTheme) -> None:
         for digit in self.digits:
-            digit.update_is_complete(board_val_freq, theme)
+            digit.update_is_complete(state.is_digit_complete(digit.val), theme)
 
     def reset(self, theme: AppTheme) -> None:
         for digit in self.digits:
@@ -91,14 +110,13 @@ class Digits:
     def redraw(self, theme: AppTheme) -> None:
         self.parent.surface.fill(theme.background)
         for digit in self.digits:
-            digit.theme = theme
-            digit.region.surface.fill(theme.background)
             digit.region.set_hover_color(theme.foreground)
             digit.draw_val(theme)
 
     def get_collided(self, offset: Vector2) -> Optional[Digit]:
-        for digit in self.digits:
-            if digit.region.is_collided(offset + Vector2(self.parent.placement.topleft)):
-                return digit
+        x, y = Pointer.pos
+        if (index := self._digit_index.get_cell(x - offset.x - self.parent.placement.x,
+                                                y - offset.y - self.parent.placement.y)) is None:
+            return None
 
-        return None
+        return self.digits[index[1]]
@@ -1,10 +1,10 @@
-from pygame import mouse
 from pygame.math import Vector2
 from pygame.surface import Surface
 
 from asset import AssetManager
 from config.app_config import ERASER_ICON
 from config.app_config import HOVER_ALPHA
+from layout import Pointer
 from region import Region
 from themes import AppTheme
 
@@ -28,7 +28,7 @@ class Eraser:
                                      Vector2(min(self.parent.surface.get_size())))
 
     def is_collided(self, offset: Vector2) -> bool:
-        mouse_pos: Vector2 = Vector2(mouse.get_pos()) - Vector2(self.parent.placement.topleft) - offset - \
+        mouse_pos: Vector2 = Vector2(Pointer.pos) - Vector2(self.parent.placement.topleft) - offset - \
                              Vector2(self._icon.get_rect(center=self.parent.surface.get_rect().center).topleft)
         return self._icon.get_rect().collidepoint(mouse_pos)
 
@@ -1,6 +1,5 @@
 from typing import NamedTuple
 
-from pygame import mouse
 from pygame.math import Vector2
 from pygame.rect import Rect
 from pygame.surface import Surface
@@ -9,9 +8,11 @@ from asset import AssetManager
 from config.app_config import HOVER_ALPHA
 from config.app_config import PENCIL_ICON
 from config.app_config import SWITCH_ICON
+from layout import Pointer
 from region import PartitionDirection
 from region import Region
 from themes import AppTheme
+from themes import ThemeCache
 
 
 class PencilIcons(NamedTuple):
@@ -25,7 +26,8 @@ class Pencil:
     def __init__(self, parent: Region, theme: AppTheme) -> None:
         self.parent: Region = parent
         self.is_on: bool = False
-        self._icons: PencilIcons = self._get_icons(theme)
+        self._icon_cache: ThemeCache[PencilIcons] = ThemeCache(self._get_icons)
+        self._icons: PencilIcons = self._icon_cache.get(theme)
 
     def _get_icons(self, theme: AppTheme) -> PencilIcons:
         pencil_size: Vector2 = Vector2(min(self.parent.surface.get_size()))
@@ -47,7 +49,7 @@ class Pencil:
 
     def redraw(self, theme: AppTheme) -> None:
         self.parent.surface.fill(theme.background)
-        self._icons = self._get_icons(theme)
+        self._icons = self._icon_cache.get(theme)
 
     def render_hover(self, theme: AppTheme) -> None:
         hover_pencil: Surface = Surface(self._icons.pencil.get_size())
@@ -74,5 +76,5 @@ class Pencil:
     def is_collided(self, offset: Vector2) -> bool:
         # TODO: check collision with on/off surface
         pos: Vector2 = Vector2(self._get_pencil_pos().topleft) + Vector2(self.parent.placement.topleft)
-        mouse_pos: Vector2 = Vector2(mouse.get_pos())
+        mouse_pos: Vector2 = Vector2(Pointer.pos)
         return self._icons.pencil.get_rect().collidepoint(mouse_pos - pos - offset)
@@ -1,4 +1,8 @@
+from typing import NamedTuple
+from typing import Optional
+
 from pygame.math import Vector2
+from pygame.rect import Rect
 
 from gui_eraser import Eraser
 from gui_pencil import Pencil
@@ -8,6 +12,13 @@ from themes import AppTheme
 from gui_undo import Undo
 
 
+class ToolStates(NamedTuple):
+    eraser_hovered: bool
+    pencil_hovered: bool
+    pencil_on: bool
+    undo_hovered: bool
+
+
 class Tools:
     def __init__(self, parent: Region, theme: AppTheme) -> None:
         self.parent: Region = parent
@@ -17,27 +28,45 @@ class Tools:
         self.pencil: Pencil = Pencil(pencil_region, theme)
         self.eraser: Eraser = Eraser(erase_region, theme)
         self.undo: Undo = Undo(undo_region, theme)
+        self._rendered: Optional[ToolStates] = None
+
+    def render(self, offset: Vector2, theme: AppTheme, is_dirty: bool) -> list[Rect]:
+        # returns the rects of the tools that were drawn again, relative to the parent of the tools
+        states: ToolStates = ToolStates(self.eraser.is_collided(offset), self.pencil.is_collided(offset),
+                                        self.pencil.is_on, self.undo.is_collided(offset))
+        previous: Optional[ToolStates] = None if is_dirty else self._rendered
+        self._rendered = states
+        changed: list[Rect] = []
 
-    def render(self, offset: Vector2, theme: AppTheme) -> None:
         # eraser
-        self.eraser.render()
-        if self.eraser.is_collided(offset):
-            self.eraser.hover(theme)
-        self.eraser.parent.render()
+        if previous is None or states.eraser_hovered != previous.eraser_hovered:
+            self.eraser.render()
+            if states.eraser_hovered:
+                self.eraser.hover(theme)
+            self.eraser.parent.render()
+            changed.append(self.eraser.parent.placement)
 
         # pencil
-        self.pencil.render()
-        if self.pencil.is_collided(offset):
-            self.pencil.render_hover(theme)
-        self.pencil.parent.render()
+        if previous is None or states.pencil_hovered != previous.pencil_hovered or \
+                states.pencil_on != previous.pencil_on:
+            self.pencil.render()
+            if states.pencil_hovered:
+                self.pencil.render_hover(theme)
+            self.pencil.parent.render()
+            changed.append(self.pencil.parent.placement)
 
         # undo
-        self.undo.render()
-        if self.undo.is_collided(offset):
-            self.undo.render_hover(theme)
-        self.undo.parent.render()
+        if previous is None or states.undo_hovered != previous.undo_hovered:
+            self.undo.render()
+            if states.undo_hovered:
+                self.undo.render_hover(theme)
+            self.undo.parent.render()
+            changed.append(self.undo.parent.placement)
+
+        if changed:
+            self.parent.render()
 
-        self.parent.render()
+        return [rect.move(self.parent.placement.topleft) for rect in changed]
 
     def redraw(self, theme: AppTheme) -> None:
         self.parent.surface.fill(theme.foreground)
@@ -1,20 +1,24 @@
 from queue import Queue
+from typing import Optional
 from typing import override
 
 from pygame.event import Event
-from pygame.font import Font
-from pygame.font import SysFont
-from pygame.font import get_fonts
 from pygame.math import Vector2
+from pygame.rect import Rect
 from pygame.surface import Surface
 
 from asset import AssetManager
 from config.app_config import BACK_ICON
+from config.game_config import CLOCK_FONT_SIZE
+from config.game_config import SELECTION_SUM_FONT_SIZE
 from config.game_config import TOP_BAR_PAD
 from events import AppEvent
+from fonts import FontRegistry
 from gui_component import GuiComponent
+from profiler import timed
 from region import Region
 from themes import AppTheme
+from themes import ThemeCache
 
 
 class Timer:
@@ -29,6 +33,14 @@ class Timer:
     def reset(self) -> None:
         self._time_passed = 0.0
 
+    @property
+    def time_passed(self) -> float:
+        return self._time_passed
+
+    @time_passed.setter
+    def time_passed(self, time: float) -> None:
+        self._time_passed = time
+
     def __str__(self) -> str:
         hours: int = int(self._time_passed // 3600)
         remaining_seconds: float = self._time_passed % 3600
@@ -39,28 +51,50 @@ class Timer:
 
 class TopBar(GuiComponent):
     @override
-    def render(self) -> None:
-        self._back_button.render()
-        if self._back_button.is_collided(Vector2(self.parent.placement.topleft)):
-            self._back_button.render_hover()
-
-        self._killer_calc.render()
-        self._clock.render()
+    @timed("TopBar.render")
+    def render(self) -> list[Rect]:
+        changed: list[Rect] = []
+        is_back_hovered: bool = self.is_back_collided()
+        if self._is_dirty or is_back_hovered != self._is_back_hovered:
+            self._back_button.render()
+            if is_back_hovered:
+                self._back_button.render_hover()
+
+            self._is_back_hovered = is_back_hovered
+            changed.append(self._back_button.placement)
+
+        if self._is_dirty or self._is_calc_changed:
+            self._killer_calc.render()
+            self._is_calc_changed = False
+            changed.append(self._killer_calc.placement)
+
+        if self._is_dirty or self._clock_changed is not None:
+            self._clock.render()
+            changed.append(self._clock.placement if self._clock_changed is None else self._clock_changed)
+            self._clock_changed = None
+
+        if not changed:
+            return []
 
         self.parent.render()
+        if self._is_dirty:
+            self._is_dirty = False
+            return [self.parent.placement]
+
+        return [self.to_screen(rect) for rect in changed]
 
     @override
+    @timed("TopBar.update")
     def update(self, delta_time: float) -> None:
         if self._timer.enabled:
             self._timer.pass_time(delta_time)
-            self._clock = self._create_clock()
+            self._update_clock()
 
     @override
     def update_theme(self) -> None:
-        self._back_button = self._create_back_button()
+        self._back_button = self._back_buttons.get(self._theme)
         self._killer_calc = self._create_killer_calc()
         self._clock = self._create_clock()
-        self._back_button.set_hover_color(self._theme.foreground)
         self._killer_calc.set_hover_color(self._theme.foreground)
         self._clock.set_hover_color(self._theme.foreground)
         self.parent.surface.fill(self._theme.background)
@@ -72,16 +106,22 @@ class TopBar(GuiComponent):
     def __init__(self, parent: Region, theme: AppTheme) -> None:
         super().__init__(parent, theme)
         self._timer: Timer = Timer()
-        self._font: Font = SysFont(get_fonts()[0], 50)
-        self._back_button: Region = self._create_back_button()
+        self._back_buttons: ThemeCache[Region] = ThemeCache(self._create_back_button)
+        self._back_button: Region = self._back_buttons.get(theme)
+        self._clock_text: str = str(self._timer)
         self._clock: Region = self._create_clock()
         self._killer_calc: Region = self._create_killer_calc()
+        self._is_back_hovered: bool = False
+        self._is_calc_changed: bool = False
+        self._clock_changed: Optional[Rect] = None
 
     def set_selection_sum(self, selection_sum: int) -> None:
-        sum_render: Surface = self._font.render(str(selection_sum), True, self.theme.foreground, self.theme.background)
+        sum_render: Surface = FontRegistry.render(str(selection_sum), SELECTION_SUM_FONT_SIZE, self.theme.foreground,
+                                                  self.theme.background)
         self._killer_calc.surface.fill(self.theme.background)
         self._killer_calc.surface.blit(sum_render,
                                        sum_render.get_rect(center=self._killer_calc.surface.get_rect().center))
+        self._is_calc_changed = True
 
     def begin_timer(self) -> None:
         self._timer.enabled = True
@@ -91,26 +131,57 @@ class TopBar(GuiComponent):
 
     def reset_timer(self) -> None:
         self._timer.reset()
+        self._update_clock()
+
+    @property
+    def elapsed_time(self) -> float:
+        return self._timer.time_passed
+
+    @elapsed_time.setter
+    def elapsed_time(self, time: float) -> None:
+        self._timer.time_passed = time
+        self._update_clock()
+
+    def get_clock_timeout(self) -> Optional[float]:
+        # seconds until the clock shows the next second
+        if not self._timer.enabled:
+            return None
+
+        return 1 - (self._timer.time_passed % 1)
+
+    def _update_clock(self) -> None:
+        # the clock only shows whole seconds, it is drawn again when the text changes
+        if (clock_text := str(self._timer)) == self._clock_text:
+            return
+
+        previous: Rect = self._clock.placement
+        self.parent.surface.fill(self._theme.background, previous)
+        self._clock_text = clock_text
+        self._clock = self._create_clock()
+        self._clock_changed = previous.union(self._clock.placement)
 
     def _create_clock(self) -> Region:
-        clock_surface: Surface = SysFont(get_fonts()[0], 40).render(str(self._timer), True, self._theme.foreground,
-                                                                    self._theme.background)
+        clock_surface: Surface = FontRegistry.render(self._clock_text, CLOCK_FONT_SIZE, self._theme.foreground,
+                                                     self._theme.background)
         mid_bottom: Vector2 = Vector2(self.parent.surface.get_rect().midbottom)
         mid_bottom.y -= TOP_BAR_PAD * 2
         return Region(self.parent.surface, clock_surface, clock_surface.get_rect(midbottom=mid_bottom))
 
     def _create_killer_calc(self) -> Region:
-        calc_surf: Surface = Surface(self._font.size("0000"))
+        calc_surf: Surface = Surface(FontRegistry.get_font(SELECTION_SUM_FONT_SIZE).size("0000"))
         calc_surf.fill(self.theme.background)
         return Region(self.parent.surface, calc_surf,
                       calc_surf.get_rect(topright=(self.parent.surface.get_width() - TOP_BAR_PAD, TOP_BAR_PAD)))
 
-    def _create_back_button(self) -> Region:
+    def _create_back_button(self, theme: AppTheme) -> Region:
         back_surface: Surface = \
-            AssetManager.get_icon(BACK_ICON, self._theme.foreground, self._theme.background,
+            AssetManager.get_icon(BACK_ICON, theme.foreground, theme.background,
                                   Vector2(min(self.parent.surface.get_size())) - Vector2(TOP_BAR_PAD * 2))
 
-        return Region(self.parent.surface, back_surface, back_surface.get_rect(topleft=(TOP_BAR_PAD, TOP_BAR_PAD)))
+        back_button: Region = Region(self.parent.surface, back_surface,
+                                     back_surface.get_rect(topleft=(TOP_BAR_PAD, TOP_BAR_PAD)))
+        back_button.set_hover_color(theme.foreground)
+        return back_button
 
     def is_back_collided(self) -> bool:
         return self._back_button.is_collided(Vector2(self.parent.placement.topleft))
@@ -1,10 +1,10 @@
-from pygame import mouse
 from pygame.math import Vector2
 from pygame.surface import Surface
 
 from asset import AssetManager
 from config.app_config import HOVER_ALPHA
 from config.app_config import UNDO_ICON
+from layout import Pointer
 from region import Region
 from themes import AppTheme
 
@@ -37,5 +37,5 @@ class Undo:
 
     def is_collided(self, offset: Vector2) -> bool:
         pos: Vector2 = self._get_pos() + Vector2(self.parent.placement.topleft)
-        mouse_pos: Vector2 = Vector2(mouse.get_pos())
+        mouse_pos: Vector2 = Vector2(Pointer.pos)
         return self._icon.get_rect().collidepoint(mouse_pos - pos - offset)
@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import NamedTuple
+from typing import Optional
+
+from cage_combinations import ALL_DIGITS
+from cage_combinations import MAX_CAGE_SUM
+from cage_combinations import get_cage_combinations
+from config.app_config import BOARD_SIZE
+from killer_sudoku_state import Board
+from puzzle_store import Puzzle
+
+# Candidates of a cell are stored as a 9 bit mask, bit (digit - 1) is set when digit is still possible.
+CELL_COUNT: int = BOARD_SIZE * BOARD_SIZE
+
+BIT_COUNT: tuple[int, ...] = tuple(bin(mask).count("1") for mask in range(ALL_DIGITS + 1))
+MASK_DIGIT: tuple[int, ...] = tuple(mask.bit_length() if BIT_COUNT[mask] == 1 else 0
+                                    for mask in range(ALL_DIGITS + 1))
+MASK_BITS: tuple[tuple[int, ...], ...] = tuple(tuple(1 << digit for digit in range(BOARD_SIZE) if mask & (1 << digit))
+                                               for mask in range(ALL_DIGITS + 1))
+
+
+def _create_units() -> tuple[tuple[int, ...], ...]:
+    rows: list[tuple[int, ...]] = [tuple((row * BOARD_SIZE) + col for col in range(BOARD_SIZE))
+                                   for row in range(BOARD_SIZE)]
+    cols: list[tuple[int, ...]] = [tuple((row * BOARD_SIZE) + col for row in range(BOARD_SIZE))
+                                   for col in range(BOARD_SIZE)]
+    boxes: list[tuple[int, ...]] = [
+        tuple(((box_row + row) * BOARD_SIZE) + box_col + col for row in range(3) for col in range(3))
+        for box_row in range(0, BOARD_SIZE, 3) for box_col in range(0, BOARD_SIZE, 3)
+    ]
+    return tuple(rows + cols + boxes)
+
+
+UNITS: tuple[tuple[int, ...], ...] = _create_units()
+PEERS: tuple[frozenset[int], ...] = tuple(
+    frozenset(peer for unit in UNITS if cell in unit for peer in unit if peer != cell) for cell in range(CELL_COUNT)
+)
+
+
+type SumConstraint = tuple[int, tuple[int, ...]]
+
+
+class NodeLimitExceeded(Exception):
+    pass
+
+
+class SolveResult(NamedTuple):
+    solution: Optional[Board]
+    solution_count: int
+    nodes: int
+
+
+class CageOptions(NamedTuple):
+    unsolved: list[int]
+    # digits of the combinations the unsolved cells can still take, in any and in all of them
+    union: int
+    required: int
+
+
+class KillerSudokuSolver:
+
+    def __init__(self, puzzle: Puzzle) -> None:
+        self._cages: list[SumConstraint] = [
+            (cage_sum, tuple((row * BOARD_SIZE) + col for row, col in cells)) for cage_sum, cells in puzzle.cages
+        ]
+
+        cage_peers: list[set[int]] = [set(peers) for peers in PEERS]
+        for _, cells in self._cages:
+            for cell in cells:
+                cage_peers[cell].update(peer for peer in cells if peer != cell)
+
+        self._peers: tuple[tuple[int, ...], ...] = tuple(tuple(sorted(peers)) for peers in cage_peers)
+        self._sum_constraints: list[SumConstraint] = self._cages + get_innies(self._cages)
+        cell_constraints: list[list[int]] = [[] for _ in range(CELL_COUNT)]
+        for index, cells in enumerate([cells for _, cells in self._sum_constraints] + list(UNITS)):
+            for cell in cells:
+                cell_constraints[cell].append(index)
+
+        self._cell_constraints: tuple[tuple[int, ...], ...] = tuple(tuple(indices) for indices in cell_constraints)
+        # cells whose candidates changed since the constraints holding them were last looked at
+        self._changed_cells: list[int] = []
+        self._nodes: int = 0
+        self._max_nodes: Optional[int] = None
+
+    def solve(self, limit: int = 2) -> SolveResult:
+        solutions: list[Board] = self.find_solutions(limit)
+        return SolveResult(solutions[0] if solutions else None, len(solutions), self._nodes)
+
+    def find_solutions(self, limit: int = 2, max_nodes: Optional[int] = None) -> list[Board]:
+        self._nodes = 0
+        self._max_nodes = max_nodes
+        solutions: list[list[int]] = []
+        candidates: list[int] = [ALL_DIGITS] * CELL_COUNT
+
+        self._changed_cells[:] = range(CELL_COUNT)
+        if self._propagate(candidates):
+            self._search(candidates, solutions, limit)
+
+        return [[[MASK_DIGIT[mask] for mask in solution[row * BOARD_SIZE:(row + 1) * BOARD_SIZE]]
+                 for row in range(BOARD_SIZE)] for solution in solutions]
+
+    @property
+    def nodes(self) -> int:
+        return self._nodes
+
+    def _search(self, candidates: list[int], solutions: list[list[int]], limit: int) -> None:
+        self._nodes += 1
+        if self._max_nodes is not None and self._nodes > self._max_nodes:
+            raise NodeLimitExceeded(f"search gave up after {self._max_nodes} nodes")
+
+        branch_cell: int = -1
+        branch_count: int = BOARD_SIZE + 1
+        for cell, mask in enumerate(candidates):
+            count: int = BIT_COUNT[mask]
+            if 1 < count < branch_count:
+                branch_cell = cell
+                branch_count = count
+                if count == 2:
+                    break
+
+        if branch_cell == -1:
+            solutions.append(candidates)
+            return
+
+        for bit in MASK_BITS[candidates[branch_cell]]:
+            branch: list[int] = candidates.copy()
+            self._changed_cells.clear()
+            if self._assign(branch, branch_cell, bit) and self._propagate(branch):
+                self._search(branch, solutions, limit)
+
+            if len(solutions) >= limit:
+                return
+
+    def _assign(self, candidates: list[int], cell: int, bit: int) -> bool:
+        candidates[cell] = bit
+        changed: list[int] = self._changed_cells
+        changed.append(cell)
+        pending: list[tuple[int, int]] = [(cell, bit)]
+        peers: tuple[tuple[int, ...], ...] = self._peers
+        while pending:
+            placed_cell, placed_bit = pending.pop()
+            for peer in peers[placed_cell]:
+                mask: int = candidates[peer]
+                if not mask & placed_bit:
+                    continue
+
+                mask ^= placed_bit
+                if mask == 0:
+                    return False
+
+                candidates[peer] = mask
+                changed.append(peer)
+                if BIT_COUNT[mask] == 1:
+                    pending.append((peer, mask))
+
+        return True
+
+    def _restrict(self, candidates: list[int], cell: int, mask: int) -> bool:
+        if mask == 0:
+            return False
+
+        if BIT_COUNT[mask] == 1:
+            return self._assign(candidates, cell, mask)
+
+        candidates[cell] = mask
+        self._changed_cells.append(cell)
+        return True
+
+    def _propagate(self, candidates: list[int]) -> bool:
+        # sum constraints and units are indexed together, units after the sum constraints. one is only looked at
+        # again once a cell it holds has changed since the last time
+        changed: list[int] = self._changed_cells
+        cell_constraints: tuple[tuple[int, ...], ...] = self._cell_constraints
+        sum_count: int = len(self._sum_constraints)
+        queued: bytearray = bytearray(sum_count + len(UNITS))
+        queue: deque[int] = deque()
+        while True:
+            for cell in changed:
+                for index in cell_constraints[cell]:
+                    if not queued[index]:
+                        queued[index] = 1
+                        queue.append(index)
+
+            changed.clear()
+            if not queue:
+                return True
+
+            index: int = queue.popleft()
+            queued[index] = 0
+            if index < sum_count:
+                is_consistent: bool = self._apply_sum(candidates, *self._sum_constraints[index])
+
+            else:
+                is_consistent = self._apply_unit(candidates, UNITS[index - sum_count])
+
+            if not is_consistent:
+                changed.clear()
+                return False
+
+    def _apply_sum(self, candidates: list[int], cage_sum: int, cells: tuple[int, ...]) -> bool:
+        if (options := get_cage_options(cage_sum, cells, candidates)) is None:
+            return False
+
+        unsolved, union, required = options
+        for cell in unsolved:
+            mask: int = candidates[cell]
+            if mask & union != mask and not self._restrict(candidates, cell, mask & union):
+                return False
+
+        # a digit every combination left needs is in one of the cells that can still take it
+        for bit in MASK_BITS[required]:
+            holders: list[int] = [cell for cell in unsolved if candidates[cell] & bit]
+            if not holders:
+                return False
+
+            if len(holders) == 1:
+                if candidates[holders[0]] != bit and not self._assign(candidates, holders[0], bit):
+                    return False
+                continue
+
+            for peer in PEERS[holders[0]].intersection(*(PEERS[cell] for cell in holders[1:])):
+                if candidates[peer] & bit and peer not in cells:
+                    if not self._restrict(candidates, peer, candidates[peer] ^ bit):
+                        return False
+
+        return True
+
+    def _apply_unit(self, candidates: list[int], unit: tuple[int, ...]) -> bool:
+        # every digit needs a cell in the unit, a digit only one cell can take goes there
+        seen_once: int = 0
+        seen_twice: int = 0
+        for cell in unit:
+            mask: int = candidates[cell]
+            seen_twice |= seen_once & mask
+            seen_once |= mask
+
+        if seen_once != ALL_DIGITS:
+            return False
+
+        for bit in MASK_BITS[seen_once & ~seen_twice]:
+            for cell in unit:
+                if candidates[cell] & bit:
+                    if candidates[cell] != bit and not self._assign(candidates, cell, bit):
+                        return False
+                    break
+
+            else:
+                return False
+
+        return True
+
+
+def get_innies(cages: list[SumConstraint]) -> list[SumConstraint]:
+    # 45 rule, the cells of a unit that are not covered by cages lying inside the unit add up to
+    # 45 minus those cages, they are all different digits so they behave like an extra cage
+    innies: list[SumConstraint] = []
+    for unit in UNITS:
+        unit_cells: set[int] = set(unit)
+        remaining: int = MAX_CAGE_SUM
+        for cage_sum, cells in cages:
+            if unit_cells.issuperset(cells):
+                unit_cells.difference_update(cells)
+                remaining -= cage_sum
+
+        if 0 < len(unit_cells) < BOARD_SIZE:
+            innies.append((remaining, tuple(sorted(unit_cells))))
+
+    return innies
+
+
+def get_cage_options(cage_sum: int, cells: tuple[int, ...], candidates: list[int]) -> Optional[CageOptions]:
+    # None when the cells cannot add up to the sum any more
+    remaining: int = cage_sum
+    used: int = 0
+    unsolved: list[int] = []
+    allowed: int = 0
+    for cell in cells:
+        mask: int = candidates[cell]
+        if BIT_COUNT[mask] == 1:
+            remaining -= MASK_DIGIT[mask]
+            used |= mask
+
+        else:
+            unsolved.append(cell)
+            allowed |= mask
+
+    if not unsolved:
+        return None if remaining != 0 else CageOptions(unsolved, 0, 0)
+
+    union: int = 0
+    required: int = ALL_DIGITS
+    # the cells with the fewest candidates are tried first, they go at the end
+    cell_candidates: list[int] = sorted((candidates[cell] for cell in unsolved), key=BIT_COUNT.__getitem__,
+                                        reverse=True)
+    for combination in get_cage_combinations(remaining, len(unsolved), used).combinations:
+        if combination & allowed == combination and can_place(combination, cell_candidates):
+            union |= combination
+            required &= combination
+
+    if union == 0:
+        return None
+
+    return CageOptions(unsolved, union, required)
+
+
+def can_place(digits: int, cell_candidates: list[int], count: Optional[int] = None) -> bool:
+    # true when the first `count` cells, all of them by default, can each take a different digit out of digits
+    if count is None:
+        count = len(cell_candidates)
+
+    if count == 0:
+        return True
+
+    for bit in MASK_BITS[cell_candidates[count - 1] & digits]:
+        if can_place(digits ^ bit, cell_candidates, count - 1):
+            return True
+
+    return False
+
+
+def solve_puzzle(puzzle: Puzzle, limit: int = 2) -> SolveResult:
+    return KillerSudokuSolver(puzzle).solve(limit)
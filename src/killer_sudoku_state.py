@@ -1,71 +1,164 @@
 from __future__ import annotations
 
 from abc import ABC
+from array import array
 from functools import cache
 from itertools import chain
-from itertools import product
-from queue import LifoQueue
 from typing import Optional
 
+from cage_combinations import to_digits
+from move_history import CellDelta
+from move_history import MoveHistory
+from puzzle import NO_CAGE
 from puzzle_store import Puzzle
 
 type Board = list[list[int]]
-type PencilMarks = list[list[list[int]]]
+
+CELL_COUNT: int = 81
+
+# digits of every 9 bit pencil mark mask, bit (digit - 1) is set when the digit is marked
+MARK_DIGITS: tuple[tuple[int, ...], ...] = tuple(tuple(to_digits(mask)) for mask in range(1 << 9))
+
+# the other cells in the row, column and box of every cell
+CELL_PEERS: tuple[bytes, ...] = tuple(
+    bytes(peer for peer in range(CELL_COUNT)
+          if peer != cell and (peer // 9 == cell // 9 or peer % 9 == cell % 9 or
+                               (peer // 27 == cell // 27 and (peer % 9) // 3 == (cell % 9) // 3)))
+    for cell in range(CELL_COUNT)
+)
 
 
 class Move(ABC):
 
-    def __init__(self, affected_cells: list[tuple[int, int]], state: KillerSudokuState) -> None:
+    def __init__(self, affected_cells: list[tuple[int, int]]) -> None:
         self.affected_cells: list[tuple[int, int]] = affected_cells
-        self.prev_vals: dict[tuple[int, int], int] = {(row, col): state[row][col] for row, col in affected_cells}
-        self.prev_marks: dict[tuple[int, int], list[int]] = {
-            (row, col): state.get_pencil_markings(row, col).copy() for row, col in affected_cells
-        }
+        self.cells: bytes = bytes((row * 9) + col for row, col in affected_cells)
 
 
 class Place(Move):
 
-    def __init__(self, affected_cells: list[tuple[int, int]], state: KillerSudokuState,
-                 value: int, is_pencil: bool) -> None:
-        super().__init__(affected_cells, state)
+    def __init__(self, affected_cells: list[tuple[int, int]], value: int, is_pencil: bool) -> None:
+        super().__init__(affected_cells)
         self.value: int = value
         self.is_pencil: bool = is_pencil
 
 
 class Delete(Move):
 
-    def __init__(self, affected_cells: list[tuple[int, int]], state: KillerSudokuState) -> None:
-        super().__init__(affected_cells, state)
+    def __init__(self, affected_cells: list[tuple[int, int]]) -> None:
+        super().__init__(affected_cells)
 
 
 class KillerSudokuState:
 
     def __init__(self) -> None:
         self._puzzle: Optional[Puzzle] = None
-        self._board_vals: Board = [[0] * 9 for _ in range(9)]
-        self._pencil_marks: PencilMarks = [[[], [], [], [], [], [], [], [], []] for _ in range(9)]
-        self._moves: LifoQueue[Move] = LifoQueue()
-
-    def __getitem__(self, index: int) -> list[int]:
-        return self._board_vals[index]
+        self._board_vals: bytearray = bytearray(CELL_COUNT)
+        self._board_view: memoryview = memoryview(self._board_vals).toreadonly()
+        self._pencil_marks: array[int] = array("H", bytes(CELL_COUNT * 2))
+        self._history: MoveHistory = MoveHistory()
+        self._history.clear(*self.get_snapshot())
+        # cells that may look different since take_changed_cells was last called, their value, marks or the
+        # validity of either changed. the mask of the digits a cell changed between is kept as well, the peers
+        # holding those digits are only looked up when the cells are taken
+        self._changed_cells: set[int] = set(range(CELL_COUNT))
+        self._changed_digits: dict[int, int] = {}
+
+        # digit counts per row, column and box, index 0 is unused so a digit indexes its own count
+        self._row_counts: list[list[int]] = [[0] * 10 for _ in range(9)]
+        self._col_counts: list[list[int]] = [[0] * 10 for _ in range(9)]
+        self._box_counts: list[list[int]] = [[0] * 10 for _ in range(9)]
+        # index 0 counts the empty cells
+        self._digit_counts: list[int] = [CELL_COUNT] + [0] * 9
+        self._filled: int = 0
+        self._conflicts: int = 0
+
+        # running totals per cage, updated with every value change
+        self._cage_sums: list[int] = []
+        self._cage_filled: list[int] = []
+        self._solved_cages: int = 0
+
+    def __getitem__(self, index: int) -> memoryview:
+        return self._board_view[index * 9:(index + 1) * 9]
 
     def get_state(self) -> Board:
-        return self._board_vals
+        return [list(self._board_vals[row * 9:(row + 1) * 9]) for row in range(9)]
+
+    def get_value(self, cell: int) -> int:
+        return self._board_vals[cell]
+
+    def get_mark_mask(self, cell: int) -> int:
+        return self._pencil_marks[cell]
+
+    def take_changed_cells(self) -> set[int]:
+        # values and marks of a changed digit in the same row, column or box can become valid or invalid
+        changed: set[int] = self._changed_cells
+        for cell, mark_mask in self._changed_digits.items():
+            for peer in CELL_PEERS[cell]:
+                if self._pencil_marks[peer] & mark_mask or ((1 << self._board_vals[peer]) >> 1) & mark_mask:
+                    changed.add(peer)
+
+        self._changed_cells = set()
+        self._changed_digits = {}
+        return changed
+
+    def undo_move(self) -> list[CellDelta]:
+        # the deltas of the move that was undone, empty when there was nothing to undo
+        if not self._history.can_undo():
+            return []
+
+        deltas: list[CellDelta] = self._history.get_move(len(self._history) - 1)
+        self._restore(self._history.undo())
+        return deltas
+
+    def redo_move(self) -> list[CellDelta]:
+        if not self._history.can_redo():
+            return []
+
+        deltas: list[CellDelta] = self._history.get_move(len(self._history))
+        self._restore(self._history.redo())
+        return deltas
+
+    def replay_undo(self, deltas: list[CellDelta]) -> None:
+        # a resumed game only has the moves made since its snapshot in the history, an undo of an older move is
+        # applied from its deltas and the history starts over from the board it leaves
+        if self._history.can_undo():
+            self.undo_move()
+            return
+
+        self._restore([(delta.cell, delta.old_val, delta.old_marks) for delta in reversed(deltas)])
+        self._history.clear(*self.get_snapshot())
 
-    def undo_move(self) -> None:
-        if self._moves.empty():
+    def replay_redo(self, deltas: list[CellDelta]) -> None:
+        if self._history.can_redo():
+            self.redo_move()
             return
 
-        move: Move = self._moves.get()
-        for cell_index, value in move.prev_vals.items():
-            row, col = cell_index
-            self._board_vals[row][col] = value
+        self._restore([(delta.cell, delta.new_val, delta.new_marks) for delta in deltas])
+        self._history.clear(*self.get_snapshot())
+
+    def seek(self, move_number: int) -> None:
+        checkpoint, cells = self._history.seek(move_number)
+        if checkpoint is not None:
+            board: bytes = checkpoint.board
+            marks: array[int] = array("H", checkpoint.marks)
+            self._restore([(cell, board[cell], marks[cell]) for cell in range(CELL_COUNT)
+                           if self._board_vals[cell] != board[cell] or self._pencil_marks[cell] != marks[cell]])
+
+        self._restore(cells)
 
-        for cell_index, markings in move.prev_marks.items():
-            row, col = cell_index
-            self._pencil_marks[row][col] = markings
+    @property
+    def move_number(self) -> int:
+        return self._history.move_number
+
+    @property
+    def move_range(self) -> tuple[int, int]:
+        return self._history.first_move, self._history.last_move
+
+    def process_move(self, move: Move) -> list[CellDelta]:
+        prev_vals: bytes = bytes(self._board_vals[cell] for cell in move.cells)
+        prev_marks: array[int] = array("H", (self._pencil_marks[cell] for cell in move.cells))
 
-    def process_move(self, move: Move) -> None:
         if isinstance(move, Place):
             self._handle_place(move)
 
@@ -75,96 +168,158 @@ class KillerSudokuState:
         else:
             raise Exception(f"unrecognised move {type(move)}")
 
-        self._moves.put(move)
+        deltas: list[CellDelta] = [
+            CellDelta(cell, prev_val, self._board_vals[cell], prev_mark, self._pencil_marks[cell])
+            for cell, prev_val, prev_mark in zip(move.cells, prev_vals, prev_marks)
+            if prev_val != self._board_vals[cell] or prev_mark != self._pencil_marks[cell]
+        ]
+        self._push_history(deltas)
+        return deltas
 
-    def get_pencil_markings(self, row: int, col: int) -> list[int]:
-        return self._pencil_marks[row][col]
+    def replay_move(self, deltas: list[CellDelta]) -> None:
+        self._restore([(delta.cell, delta.new_val, delta.new_marks) for delta in deltas])
+        self._push_history(deltas)
 
-    def is_value_valid(self, row: int, col: int) -> bool:
-        value: int = self._board_vals[row][col]
-        for r, c in get_sudoku_neighbours(row, col):
-            if (r, c) == (row, col):
-                continue
+    def get_snapshot(self) -> tuple[bytes, bytes]:
+        return bytes(self._board_vals), self._pencil_marks.tobytes()
+
+    def restore_snapshot(self, board: bytes, marks: bytes) -> None:
+        self._board_vals[:] = board
+        self._pencil_marks[:] = array("H", marks)
+        self._history.clear(board, marks)
+        self._reset_counts()
 
-            if self._board_vals[r][c] == value:
-                return False
+    def get_pencil_markings(self, row: int, col: int) -> tuple[int, ...]:
+        return MARK_DIGITS[self._pencil_marks[(row * 9) + col]]
+
+    def is_value_valid(self, row: int, col: int) -> bool:
+        if (value := self._board_vals[(row * 9) + col]) == 0:
+            return True
 
-        return True
+        return self._row_counts[row][value] == 1 and self._col_counts[col][value] == 1 and \
+            self._box_counts[get_box(row, col)][value] == 1
 
     def is_mark_valid(self, mark: int, row: int, col: int) -> bool:
-        assert mark in self._pencil_marks[row][col]
-        for r, c in get_sudoku_neighbours(row, col):
-            if self._board_vals[r][c] == mark:
-                return False
+        assert self._pencil_marks[(row * 9) + col] & (1 << (mark - 1))
+        return self._row_counts[row][mark] == 0 and self._col_counts[col][mark] == 0 and \
+            self._box_counts[get_box(row, col)][mark] == 0
 
-        return True
+    def get_digit_count(self, digit: int) -> int:
+        return self._digit_counts[digit]
+
+    def is_digit_complete(self, digit: int) -> bool:
+        return self._digit_counts[digit] >= 9
 
     def is_puzzle_solved(self) -> bool:
-        if list(chain.from_iterable(self._board_vals)).count(0) >= 1:
-            return False
+        return self._filled == CELL_COUNT and self._conflicts == 0 and self._solved_cages == len(self.puzzle.cages)
 
-        for cage in self._puzzle.cages:
-            if not self.is_cage_valid(*cage):
-                return False
+    def is_cage_index_valid(self, cage_index: int) -> bool:
+        cage_sum, cage_cells = self.puzzle.cages[cage_index]
+        if self._cage_filled[cage_index] == len(cage_cells):
+            return self._cage_sums[cage_index] == cage_sum
 
-        for row, col in product(range(9), range(9)):
-            for n_row, n_col in get_sudoku_neighbours(row, col):
-                if self._board_vals[n_row][n_col] == self._board_vals[row][col]:
-                    return False
+        return self._cage_sums[cage_index] < cage_sum
 
-        return True
+    def clear(self) -> None:
+        self._board_vals[:] = bytes(CELL_COUNT)
+        self._pencil_marks[:] = array("H", bytes(CELL_COUNT * 2))
+        self._history.clear(*self.get_snapshot())
+        self._reset_counts()
+
+    def _reset_counts(self) -> None:
+        for counts in chain(self._row_counts, self._col_counts, self._box_counts):
+            counts[:] = [0] * 10
+
+        self._digit_counts[:] = [CELL_COUNT] + [0] * 9
+        self._changed_cells.update(range(CELL_COUNT))
+        self._filled = 0
+        self._conflicts = 0
+
+        cage_count: int = 0 if self._puzzle is None else len(self._puzzle.cages)
+        self._cage_sums = [0] * cage_count
+        self._cage_filled = [0] * cage_count
+        self._solved_cages = 0
+
+        board_vals: bytes = bytes(self._board_vals)
+        self._board_vals[:] = bytes(CELL_COUNT)
+        for cell, value in enumerate(board_vals):
+            self._set_value(cell, value)
+
+    def _push_history(self, deltas: list[CellDelta]) -> None:
+        self._history.push(deltas)
+        if self._history.needs_checkpoint:
+            self._history.add_checkpoint(*self.get_snapshot())
+
+    def _restore(self, cells: list[tuple[int, int, int]]) -> None:
+        for cell, value, marks in cells:
+            self._set_value(cell, value)
+            if self._pencil_marks[cell] != marks:
+                self._pencil_marks[cell] = marks
+                self._changed_cells.add(cell)
+
+    def _set_value(self, cell: int, value: int) -> None:
+        prev: int = self._board_vals[cell]
+        if prev == value:
+            return
 
-    def is_cage_valid(self, cage_sum: int, cage_cells: list[tuple[int, int]]) -> bool:
-        current_sum: int = 0
-        is_complete: bool = True
-        for row, col in cage_cells:
-            cell_val: int = self._board_vals[row][col]
-            current_sum += cell_val
+        self._board_vals[cell] = value
+        row, col = divmod(cell, 9)
+        cage_index: int = NO_CAGE if self._puzzle is None else self._puzzle.cage_map[cell]
+        was_solved: bool = cage_index != NO_CAGE and self._is_cage_solved(cage_index)
 
-            if cell_val == 0:
-                is_complete = False
+        for counts in (self._row_counts[row], self._col_counts[col], self._box_counts[get_box(row, col)]):
+            if prev != 0:
+                counts[prev] -= 1
+                if counts[prev] == 1:
+                    self._conflicts -= 1
 
-        if is_complete:
-            return current_sum == cage_sum
+            if value != 0:
+                counts[value] += 1
+                if counts[value] == 2:
+                    self._conflicts += 1
 
-        return current_sum < cage_sum
+        self._digit_counts[prev] -= 1
+        self._digit_counts[value] += 1
+        self._filled += (value != 0) - (prev != 0)
 
-    def clear(self) -> None:
-        self._board_vals = [[0] * 9 for _ in range(9)]
-        for markings in chain.from_iterable(self._pencil_marks):
-            markings.clear()
+        self._changed_cells.add(cell)
+        self._changed_digits[cell] = self._changed_digits.get(cell, 0) | (((1 << prev) | (1 << value)) >> 1)
+
+        if cage_index == NO_CAGE:
+            return
+
+        self._cage_sums[cage_index] += value - prev
+        self._cage_filled[cage_index] += (value != 0) - (prev != 0)
+
+        self._solved_cages += self._is_cage_solved(cage_index) - was_solved
+
+    def _is_cage_solved(self, cage_index: int) -> bool:
+        cage_sum, cage_cells = self.puzzle.cages[cage_index]
+        return self._cage_filled[cage_index] == len(cage_cells) and self._cage_sums[cage_index] == cage_sum
 
     def _handle_place(self, place: Place) -> None:
-        for row, col in place.affected_cells:
+        for cell in place.cells:
             if place.is_pencil:
-                self._add_pencil_mark(row, col, place.value)
+                self._toggle_pencil_mark(cell, place.value)
 
             else:
-                self._board_vals[row][col] = place.value
+                self._set_value(cell, place.value)
 
     def _handle_delete(self, delete: Delete) -> None:
-        for row, col in delete.affected_cells:
-            cell_val: int = self._board_vals[row][col]
-            if cell_val != 0:
-                self._board_vals[row][col] = 0
-
-            else:
-                self._pencil_marks[row][col].clear()
+        for cell in delete.cells:
+            if self._board_vals[cell] != 0:
+                self._set_value(cell, 0)
 
-    def _add_pencil_mark(self, row: int, col: int, mark: int) -> None:
-        markings: list[int] = self._pencil_marks[row][col]
+            elif self._pencil_marks[cell] != 0:
+                self._pencil_marks[cell] = 0
+                self._changed_cells.add(cell)
 
+    def _toggle_pencil_mark(self, cell: int, mark: int) -> None:
         if mark == 0:
             return
 
-        if mark in markings:
-            markings.remove(mark)
-
-        else:
-            markings.append(mark)
-            markings.sort()
-
-        assert 0 <= len(markings) <= 9
+        self._pencil_marks[cell] ^= 1 << (mark - 1)
+        self._changed_cells.add(cell)
 
     @property
     def puzzle(self) -> Puzzle:
@@ -174,12 +329,17 @@ class KillerSudokuState:
     @puzzle.setter
     def puzzle(self, new_puzzle: Puzzle) -> None:
         self._puzzle = new_puzzle
+        self._reset_counts()
 
     @puzzle.deleter
     def puzzle(self) -> None:
         del self._puzzle
 
 
+def get_box(row: int, col: int) -> int:
+    return ((row // 3) * 3) + (col // 3)
+
+
 @cache
 def get_sudoku_neighbours(row: int, col: int) -> list[tuple[int, int]]:
     neighbours: list[tuple[int, int]] = [(row, col)]
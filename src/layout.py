@@ -0,0 +1,54 @@
+from typing import Optional
+
+from pygame import mouse
+
+
+class Pointer:
+    # the mouse position is read once per frame, every hit test in the frame uses the same position
+
+    pos: tuple[int, int] = (0, 0)
+
+    @staticmethod
+    def update() -> None:
+        Pointer.pos = mouse.get_pos()
+
+
+class GridIndex:
+    # maps a point to the (row, col) of a grid of equally sized cells without looking at every cell. cells start
+    # `start` pixels in, are `gap` pixels apart and every `group` cells `group_gap` extra pixels are added, the way
+    # the board lays out its boxes. points in a gap or outside the grid hit nothing
+
+    def __init__(self, cell_size: tuple[int, int], shape: tuple[int, int], start: int = 0, gap: int = 0,
+                 group: int = 0, group_gap: int = 0) -> None:
+        self._cell_w, self._cell_h = cell_size
+        self._rows, self._cols = shape
+        self._start: int = start
+        self._gap: int = gap
+        self._group: int = group
+        self._group_gap: int = group_gap
+
+    def get_cell(self, x: float, y: float) -> Optional[tuple[int, int]]:
+        if (col := self._get_axis_index(x, self._cell_w, self._cols)) < 0:
+            return None
+
+        if (row := self._get_axis_index(y, self._cell_h, self._rows)) < 0:
+            return None
+
+        return row, col
+
+    def _get_axis_index(self, offset: float, cell_length: int, count: int) -> int:
+        offset -= self._start
+        if offset < 0:
+            return -1
+
+        step: int = cell_length + self._gap
+        group_index: int = 0
+        if self._group > 0:
+            group_index, offset = divmod(offset, (self._group * step) + self._group_gap)
+
+        index, offset = divmod(offset, step)
+        if offset >= cell_length or (self._group > 0 and index >= self._group):
+            return -1
+
+        index = int(index + (group_index * self._group))
+        return index if index < count else -1
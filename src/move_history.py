@@ -0,0 +1,173 @@
+from array import array
+from bisect import bisect_right
+from typing import NamedTuple
+
+from config.app_config import HISTORY_CHECKPOINT_INTERVAL
+from config.app_config import MAX_HISTORY_MOVES
+
+
+class CellDelta(NamedTuple):
+    cell: int
+    old_val: int
+    new_val: int
+    old_marks: int
+    new_marks: int
+
+
+class Checkpoint(NamedTuple):
+    move: int
+    board: bytes
+    marks: bytes
+
+
+class MoveHistory:
+    # deltas of every move are packed back to back in flat arrays, _move_ends holds the offset one past the
+    # last delta of each move. moves before _cursor have been applied, the ones after it can be redone.
+    # a checkpoint holds the whole board after every HISTORY_CHECKPOINT_INTERVAL moves, the first one is the
+    # board the history starts from, so any move is at most one interval of deltas away from a known board.
+
+    def __init__(self, max_moves: int = MAX_HISTORY_MOVES,
+                 checkpoint_interval: int = HISTORY_CHECKPOINT_INTERVAL) -> None:
+        assert checkpoint_interval <= max_moves // 2, "history would be trimmed past its last checkpoint"
+        self._max_moves: int = max_moves
+        self._checkpoint_interval: int = checkpoint_interval
+        self._cells: bytearray = bytearray()
+        self._old_vals: bytearray = bytearray()
+        self._new_vals: bytearray = bytearray()
+        self._old_marks: array[int] = array("H")
+        self._new_marks: array[int] = array("H")
+        self._move_ends: array[int] = array("I")
+        self._checkpoints: list[Checkpoint] = []
+        self._checkpoint_moves: list[int] = []
+        self._cursor: int = 0
+        self._first_move: int = 0
+
+    def __len__(self) -> int:
+        return self._cursor
+
+    @property
+    def move_number(self) -> int:
+        return self._first_move + self._cursor
+
+    @property
+    def first_move(self) -> int:
+        return self._first_move
+
+    @property
+    def last_move(self) -> int:
+        return self._first_move + len(self._move_ends)
+
+    @property
+    def needs_checkpoint(self) -> bool:
+        return self._cursor % self._checkpoint_interval == 0 and self._checkpoint_moves[-1] != self._cursor
+
+    def can_undo(self) -> bool:
+        return self._cursor > 0
+
+    def can_redo(self) -> bool:
+        return self._cursor < len(self._move_ends)
+
+    def push(self, deltas: list[CellDelta]) -> None:
+        if not deltas:
+            return
+
+        self._truncate(self._cursor)
+        for cell, old_val, new_val, old_marks, new_marks in deltas:
+            self._cells.append(cell)
+            self._old_vals.append(old_val)
+            self._new_vals.append(new_val)
+            self._old_marks.append(old_marks)
+            self._new_marks.append(new_marks)
+
+        self._move_ends.append(len(self._cells))
+        self._cursor += 1
+
+        # dropping the oldest half in one go keeps the cost of trimming the front of the arrays amortised
+        if self._cursor > self._max_moves:
+            self._drop_oldest(self._cursor - (self._max_moves // 2))
+
+    def get_move(self, move: int) -> list[CellDelta]:
+        start, end = self._get_bounds(move)
+        return [CellDelta(self._cells[index], self._old_vals[index], self._new_vals[index], self._old_marks[index],
+                          self._new_marks[index]) for index in range(start, end)]
+
+    def add_checkpoint(self, board: bytes, marks: bytes) -> None:
+        self._checkpoints.append(Checkpoint(self._cursor, board, marks))
+        self._checkpoint_moves.append(self._cursor)
+
+    def undo(self) -> list[tuple[int, int, int]]:
+        # (cell, value, marks) to restore, latest delta first
+        if not self.can_undo():
+            return []
+
+        self._cursor -= 1
+        start, end = self._get_bounds(self._cursor)
+        return [(self._cells[index], self._old_vals[index], self._old_marks[index])
+                for index in range(end - 1, start - 1, -1)]
+
+    def redo(self) -> list[tuple[int, int, int]]:
+        if not self.can_redo():
+            return []
+
+        start, end = self._get_bounds(self._cursor)
+        self._cursor += 1
+        return [(self._cells[index], self._new_vals[index], self._new_marks[index]) for index in range(start, end)]
+
+    def seek(self, move_number: int) -> tuple[Checkpoint | None, list[tuple[int, int, int]]]:
+        # (checkpoint to restore first or None to carry on from the current board, cells to set afterwards)
+        target: int = min(max(move_number - self._first_move, 0), len(self._move_ends))
+        checkpoint: Checkpoint = self._checkpoints[bisect_right(self._checkpoint_moves, target) - 1]
+        cells: list[tuple[int, int, int]] = []
+
+        if abs(target - self._cursor) <= target - checkpoint.move:
+            while self._cursor > target:
+                cells.extend(self.undo())
+
+            while self._cursor < target:
+                cells.extend(self.redo())
+
+            return None, cells
+
+        self._cursor = checkpoint.move
+        while self._cursor < target:
+            cells.extend(self.redo())
+
+        return checkpoint, cells
+
+    def clear(self, board: bytes, marks: bytes) -> None:
+        self._truncate(0)
+        self._first_move = 0
+        self._checkpoints = [Checkpoint(0, board, marks)]
+        self._checkpoint_moves = [0]
+
+    def _get_bounds(self, move: int) -> tuple[int, int]:
+        return (self._move_ends[move - 1] if move > 0 else 0), self._move_ends[move]
+
+    def _truncate(self, moves: int) -> None:
+        self._cursor = min(self._cursor, moves)
+        end: int = self._move_ends[moves - 1] if moves > 0 else 0
+        del self._move_ends[moves:]
+        for deltas in (self._cells, self._old_vals, self._new_vals, self._old_marks, self._new_marks):
+            del deltas[end:]
+
+        kept: int = bisect_right(self._checkpoint_moves, moves)
+        del self._checkpoints[kept:]
+        del self._checkpoint_moves[kept:]
+
+    def _drop_oldest(self, moves: int) -> None:
+        # the history has to start on a checkpoint, so only whole intervals are dropped
+        kept: int = bisect_right(self._checkpoint_moves, moves) - 1
+        moves = self._checkpoint_moves[kept]
+        if moves == 0:
+            return
+
+        offset: int = self._move_ends[moves - 1]
+        for deltas in (self._cells, self._old_vals, self._new_vals, self._old_marks, self._new_marks):
+            del deltas[:offset]
+
+        self._move_ends = array("I", (end - offset for end in self._move_ends[moves:]))
+        self._checkpoints = [checkpoint._replace(move=checkpoint.move - moves)
+                             for checkpoint in self._checkpoints[kept:]]
+        self._checkpoint_moves = [checkpoint.move for checkpoint in self._checkpoints]
+        self._cursor -= moves
+        self._first_move += moves
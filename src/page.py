@@ -6,14 +6,16 @@ from typing import Type
 
 from pygame import display
 from pygame.event import Event
+from pygame.rect import Rect
 
 from events import AppEvent
+from profiler import timed
 from themes import AppTheme
 
 
 class Page(ABC):
     @abstractmethod
-    def render(self) -> None:
+    def render(self) -> list[Rect]:
         pass
 
     @abstractmethod
@@ -28,15 +30,33 @@ class Page(ABC):
     def update_theme(self, theme: AppTheme) -> None:
         pass
 
+    @abstractmethod
+    def invalidate(self) -> None:
+        pass
+
     def __init__(self, page_id: int, events: Queue[AppEvent], theme: AppTheme) -> None:
         self._id: int = page_id
         self._theme: AppTheme = theme
         self.events: Queue[AppEvent] = events
+        self.require_full_redraw: bool = True
+
+    def get_idle_timeout(self) -> Optional[float]:
+        # seconds until the page has to be updated again without any input, None when it can wait for input
+        return None
 
+    @timed("Page.display")
     def display(self) -> None:
-        display.get_surface().fill(self._theme.background)
-        self.render()
-        display.flip()
+        # only the rects the components report are sent to the screen, an idle page costs next to nothing
+        if self.require_full_redraw:
+            self.require_full_redraw = False
+            display.get_surface().fill(self._theme.background)
+            self.invalidate()
+            self.render()
+            display.flip()
+            return
+
+        if rects := self.render():
+            display.update(rects)
 
 
 class PageManager:
@@ -63,10 +83,15 @@ class PageManager:
             return
 
         self._current_id = page_id
+        self._pages[page_id].require_full_redraw = True
+
+    def get_page(self, page_id: int) -> Optional[Page]:
+        return self._pages.get(page_id)
 
     def update_pages_theme(self, theme: AppTheme) -> None:
         for page in self._pages.values():
             page.update_theme(theme)
+            page.require_full_redraw = True
 
     def add_page(self, page_id: int, page: Type[Page], theme: AppTheme) -> None:
         self._pages[page_id] = page(page_id, self._events, theme)
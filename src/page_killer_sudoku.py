@@ -3,25 +3,45 @@ from typing import Optional
 from typing import override
 
 from pygame import BUTTON_LEFT
+from pygame import KEYDOWN
+from pygame import KMOD_CTRL
+from pygame import KMOD_SHIFT
+from pygame import K_ESCAPE
+from pygame import K_LEFT
+from pygame import K_RIGHT
+from pygame import K_SPACE
+from pygame import K_r
+from pygame import K_y
+from pygame import K_z
 from pygame import MOUSEBUTTONUP
 from pygame import display
-from pygame import mouse
 from pygame.event import Event
 from pygame.math import Vector2
+from pygame.rect import Rect
 from pygame.surface import Surface
 
 from config.app_config import HOVER_ALPHA
 from config.app_config import MAIN_MENU_PAGE
 from events import AppEvent
 from events import LaunchGameEvent
+from events import ResumeGameEvent
 from events import SetPageEvent
+from game_journal import GameJournal
+from game_journal import JournalOp
+from game_journal import RecordKind
+from game_journal import SavedGame
+from game_replay import GameReplay
 from gui_board import BoardGui
 from gui_bottom_bar import BottomBar
 from gui_top_bar import TopBar
 from killer_sudoku_state import Delete
 from killer_sudoku_state import KillerSudokuState
+from killer_sudoku_state import Move
 from killer_sudoku_state import Place
+from layout import Pointer
 from page import Page
+from profiler import timed
+from puzzle_store import Puzzle
 from puzzle_store import PuzzleDifficulty
 from region import PartitionDirection
 from region import Region
@@ -47,8 +67,12 @@ class GameOverMenu:
 
 class KillerSudoku(Page):
     @override
+    @timed("KillerSudoku.parse_event")
     def parse_event(self, game_event: Event) -> None:
-        if self._game_over:
+        if game_event.type == KEYDOWN and self._handle_replay_keys(game_event):
+            return
+
+        if self._game_over or self._replay.is_active:
             return
 
         if game_event.type == MOUSEBUTTONUP:
@@ -59,22 +83,48 @@ class KillerSudoku(Page):
                 self._handle_undo_press()
                 self._handle_end_selection()
                 self._handle_game_over()
-                self._board_display.require_redraw = True
+
+        elif game_event.type == KEYDOWN:
+            self._handle_history_keys(game_event)
 
         self._bottom_bar.parse_event(game_event, self.events)
         self._board_display.parse_event(game_event, self.events)
 
     @override
-    def render(self) -> None:
-        self._top_bar.render()
-        self._board_display.render()
-        self._bottom_bar.render()
+    @timed("KillerSudoku.render")
+    def render(self) -> list[Rect]:
+        # the game over menu is see through, it is only drawn over a full redraw so it never stacks up
+        is_menu_shown: bool = self._game_over and not self._replay.is_active
+        if is_menu_shown and not self._is_invalidated:
+            return []
 
-        if self._game_over:
+        self._is_invalidated = False
+        changed: list[Rect] = self._top_bar.render() + self._board_display.render() + self._bottom_bar.render()
+        if is_menu_shown:
             self._game_over_menu.render()
 
+        return changed
+
+    @override
+    def get_idle_timeout(self) -> Optional[float]:
+        if self._replay.is_playing:
+            return 0
+
+        return self._top_bar.get_clock_timeout()
+
+    @override
+    def invalidate(self) -> None:
+        self._is_invalidated = True
+        self._top_bar.invalidate()
+        self._board_display.invalidate()
+        self._bottom_bar.invalidate()
+
     @override
+    @timed("KillerSudoku.update")
     def update(self, delta_time: float) -> None:
+        if self._replay.update(delta_time):
+            self._refresh_board()
+
         self._board_display.update(delta_time)
         self._top_bar.update(delta_time)
 
@@ -97,13 +147,64 @@ class KillerSudoku(Page):
         self._bottom_bar: BottomBar = BottomBar(tools, self._theme)
         self._game_over_menu: GameOverMenu = GameOverMenu(display.get_surface(), self._theme)
         self._game_over: bool = False
+        self._is_invalidated: bool = True
+        self._journal: GameJournal = GameJournal()
+        self._replay: GameReplay = GameReplay(self._state)
+
+    @property
+    def has_game(self) -> bool:
+        return self._difficulty is not None
 
     def process_launch_game_event(self, launch_game: LaunchGameEvent) -> None:
+        self._replay.stop()
+        self._game_over = False
         self._state.clear()
         self._top_bar.reset_timer()
         self._state.puzzle = launch_game.puzzle
         self._difficulty = launch_game.difficulty
         self._top_bar.begin_timer()
+        self._write_journal_snapshot()
+
+    def process_resume_game_event(self, resume_game: ResumeGameEvent) -> None:
+        saved: SavedGame = resume_game.saved_game
+        self._state.puzzle = resume_game.puzzle
+        self._state.restore_snapshot(saved.snapshot.board, saved.snapshot.marks)
+        for op in saved.ops:
+            self._replay_op(op)
+
+        self._difficulty = saved.snapshot.difficulty
+        self._top_bar.reset_timer()
+        self._top_bar.elapsed_time = saved.elapsed
+        self._top_bar.begin_timer()
+        self._refresh_board()
+        self._journal.resume(saved)
+
+    def close(self) -> None:
+        self._replay.stop()
+        self._journal.record_time(self._top_bar.elapsed_time)
+        self._journal.close()
+
+    def _replay_op(self, op: JournalOp) -> None:
+        if op.kind is RecordKind.UNDO:
+            self._state.replay_undo(op.deltas)
+
+        elif op.kind is RecordKind.REDO:
+            self._state.replay_redo(op.deltas)
+
+        else:
+            self._state.replay_move(op.deltas)
+
+    def _process_move(self, move: Move) -> None:
+        self._journal.record_move(self._state.process_move(move), self._top_bar.elapsed_time)
+        if self._journal.needs_compaction:
+            self._write_journal_snapshot()
+
+    def _write_journal_snapshot(self) -> None:
+        assert self._difficulty is not None
+        board, marks = self._state.get_snapshot()
+        puzzle: Puzzle = self._state.puzzle
+        self._journal.write_snapshot(puzzle.volume, puzzle.book, puzzle.id, self._difficulty,
+                                     self._top_bar.elapsed_time, board, marks)
 
     def _handle_digit_press(self) -> None:
         if (dig := self._bottom_bar.digits.get_collided(self._bottom_bar.get_collision_offset())) is None:
@@ -113,7 +214,7 @@ class KillerSudoku(Page):
             return
 
         cells: list[tuple[int, int]] = [(cell.row, cell.col) for cell in self._board_display.selection.selected]
-        self._state.process_move(Place(cells, self._state, dig.val, self._bottom_bar.tools.pencil.is_on))
+        self._process_move(Place(cells, dig.val, self._bottom_bar.tools.pencil.is_on))
         self._bottom_bar.digits.update_digits(self._state, self._theme)
 
     def _handle_eraser_press(self) -> None:
@@ -121,14 +222,66 @@ class KillerSudoku(Page):
             return
 
         cells: list[tuple[int, int]] = [(cell.row, cell.col) for cell in self._board_display.selection.selected]
-        self._state.process_move(Delete(cells, self._state))
+        self._process_move(Delete(cells))
         self._bottom_bar.digits.update_digits(self._state, self._theme)
 
     def _handle_undo_press(self) -> None:
         if not self._bottom_bar.tools.undo.is_collided(self._bottom_bar.get_collision_offset()):
             return
 
-        self._state.undo_move()
+        self._journal.record_undo(self._state.undo_move(), self._top_bar.elapsed_time)
+        self._bottom_bar.digits.update_digits(self._state, self._theme)
+
+    def _handle_history_keys(self, key_event: Event) -> None:
+        if not key_event.mod & KMOD_CTRL:
+            return
+
+        if key_event.key == K_z and not key_event.mod & KMOD_SHIFT:
+            self._journal.record_undo(self._state.undo_move(), self._top_bar.elapsed_time)
+
+        elif key_event.key == K_y or key_event.key == K_z:
+            self._journal.record_redo(self._state.redo_move(), self._top_bar.elapsed_time)
+
+        else:
+            return
+
+        self._refresh_board()
+        self._handle_game_over()
+
+    def _handle_replay_keys(self, key_event: Event) -> bool:
+        # true when the key was used by the replay
+        if key_event.key == K_r and key_event.mod & KMOD_CTRL:
+            if self._replay.is_active:
+                self._replay.stop()
+
+            else:
+                self._replay.start()
+
+        elif not self._replay.is_active:
+            return False
+
+        elif key_event.key == K_ESCAPE:
+            self._replay.stop()
+
+        elif key_event.key == K_LEFT:
+            self._replay.step(-1)
+
+        elif key_event.key == K_RIGHT:
+            self._replay.step(1)
+
+        elif key_event.key == K_SPACE:
+            self._replay.is_playing = not self._replay.is_playing
+
+        else:
+            return True
+
+        self._refresh_board()
+        if self._game_over:
+            self.require_full_redraw = True
+
+        return True
+
+    def _refresh_board(self) -> None:
         self._bottom_bar.digits.update_digits(self._state, self._theme)
 
     def _handle_back_press(self) -> None:
@@ -136,11 +289,12 @@ class KillerSudoku(Page):
             return
 
         self.events.put(SetPageEvent(MAIN_MENU_PAGE))
+        self._journal.record_time(self._top_bar.elapsed_time)
         self._board_display.selection.clear()
         self._bottom_bar.digits.reset(self._theme)
 
     def _handle_end_selection(self) -> None:
-        if not self._board_display.parent.placement.collidepoint(mouse.get_pos()):
+        if not self._board_display.parent.placement.collidepoint(Pointer.pos):
             return
 
         self._top_bar.set_selection_sum(self._board_display.selection.get_selection_sum(self._state))
@@ -148,4 +302,6 @@ class KillerSudoku(Page):
     def _handle_game_over(self) -> None:
         if self._state.is_puzzle_solved():
             self._game_over = True
+            self.require_full_redraw = True
             self._top_bar.stop_timer()
+            self._journal.finish_game()
@@ -1,6 +1,5 @@
 from dataclasses import dataclass
 from queue import Queue
-from random import choice
 from typing import NamedTuple
 from typing import Optional
 from typing import override
@@ -8,27 +7,29 @@ from typing import override
 from pygame import BUTTON_LEFT
 from pygame import MOUSEBUTTONUP
 from pygame import display
-from pygame import mouse
 from pygame.event import Event
-from pygame.font import Font
-from pygame.font import SysFont
-from pygame.font import get_fonts
 from pygame.math import Vector2
 from pygame.rect import Rect
 from pygame.surface import Surface
 
+from config.app_config import DISABLED_ALPHA
 from config.app_config import HOVER_ALPHA
 from config.app_config import TITLE
 from config.app_config import TITLE_FONT_SIZE
 from events import AppEvent
 from events import LaunchGameEvent
 from events import ChangeThemeEvent
+from fonts import FontRegistry
+from layout import GridIndex
+from layout import Pointer
 from page import Page
+from profiler import timed
 from puzzle_store import PuzzleDifficulty
 from puzzle_store import PuzzleStore
 from region import PartitionDirection
 from region import Region
 from themes import AppTheme
+from themes import ThemeCache
 from themes import Themes
 
 
@@ -41,18 +42,36 @@ class DifficultyComponent:
 
     def __init__(self, parent: Region, theme: AppTheme) -> None:
         self._parent: Region = parent
-        self._cards: list[DifficultyCard] = self._create_cards(theme)
+        self._theme: AppTheme = theme
+        self._enabled: set[PuzzleDifficulty] = set()
+        self._card_cache: ThemeCache[list[DifficultyCard]] = ThemeCache(self._create_cards)
+        self._cards: list[DifficultyCard] = self._card_cache.get(theme)
+        self._card_index: GridIndex = GridIndex(self._cards[0].region.surface.get_size(), (len(self._cards), 1))
+        self._hovered: Optional[DifficultyCard] = None
         self._parent.surface.fill(theme.background)
+        self.is_dirty: bool = True
+
+    def enable(self, difficulty: PuzzleDifficulty) -> None:
+        if difficulty in self._enabled:
+            return
+
+        self._enabled.add(difficulty)
+        self._card_cache.clear()
+        self._cards = self._card_cache.get(self._theme)
+        self.is_dirty = True
 
     def _create_cards(self, theme: AppTheme) -> list[DifficultyCard]:
-        font: Font = SysFont(get_fonts()[0], TITLE_FONT_SIZE // 2)
         cards: list[DifficultyCard] = []
         for diff_index, region in enumerate(Region.partition(self._parent.surface, PartitionDirection.VERTICAL,
                                                              1, 1, 1, 1, 1)):
             diff: PuzzleDifficulty = PuzzleDifficulty(diff_index + 1)
 
             region.surface.fill(theme.background)
-            diff_name: Surface = font.render(diff.name, True, theme.foreground)
+            diff_name: Surface = FontRegistry.render(diff.name, TITLE_FONT_SIZE // 2, theme.foreground)
+            if diff not in self._enabled:
+                diff_name = diff_name.copy()
+                diff_name.set_alpha(DISABLED_ALPHA)
+
             region.surface.blit(diff_name, diff_name.get_rect(center=region.surface.get_rect().center))
 
             region.set_hover_color(theme.foreground)
@@ -60,24 +79,38 @@ class DifficultyComponent:
 
         return cards
 
-    def render(self) -> None:
+    def render(self) -> list[Rect]:
         collided: Optional[DifficultyCard] = self.get_collided()
+        changed: list[Rect] = []
         for card in self._cards:
+            if not self.is_dirty and (collided == card) == (self._hovered == card):
+                continue
+
             card.region.render()
             if collided == card:
                 card.region.render_hover()
 
-        self._parent.render()
+            changed.append(card.region.placement.move(self._parent.placement.topleft))
+
+        self._hovered = collided
+        self.is_dirty = False
+        if changed:
+            self._parent.render()
+
+        return changed
 
     def redraw(self, theme: AppTheme) -> None:
-        self._cards = self._create_cards(theme)
+        self._theme = theme
+        self._cards = self._card_cache.get(theme)
+        self.is_dirty = True
 
     def get_collided(self) -> Optional[DifficultyCard]:
-        for card in self._cards:
-            if card.region.is_collided(Vector2(self._parent.placement.topleft)):
-                return card
+        x, y = Pointer.pos
+        if (index := self._card_index.get_cell(x - self._parent.placement.x, y - self._parent.placement.y)) is None:
+            return None
 
-        return None
+        card: DifficultyCard = self._cards[index[0]]
+        return card if card.difficulty in self._enabled else None
 
 
 @dataclass
@@ -95,7 +128,12 @@ class ThemeComponent:
 
     def __init__(self, parent: Region, theme: AppTheme) -> None:
         self._parent: Region = parent
-        self._theme_cards: list[ThemeCard] = self._create_theme_cards(theme)
+        self._card_cache: ThemeCache[list[ThemeCard]] = ThemeCache(self._create_theme_cards)
+        self._theme_cards: list[ThemeCard] = self._card_cache.get(theme)
+        self._card_index: GridIndex = GridIndex(self._theme_cards[0].region.surface.get_size(),
+                                                (1, len(self._theme_cards)))
+        self._hovered: Optional[ThemeCard] = None
+        self.is_dirty: bool = True
 
     def _create_theme_cards(self, curr_theme: AppTheme) -> list[ThemeCard]:
         cards: list[ThemeCard] = []
@@ -124,50 +162,74 @@ class ThemeComponent:
         return cards
 
     def redraw(self, theme: AppTheme) -> None:
-        self._theme_cards = self._create_theme_cards(theme)
+        self._theme_cards = self._card_cache.get(theme)
+        self.is_dirty = True
 
-    def render(self) -> None:
+    def render(self) -> list[Rect]:
+        collided: Optional[ThemeCard] = self.get_collided()
+        changed: list[Rect] = []
         for card in self._theme_cards:
+            if not self.is_dirty and (collided is card) == (self._hovered is card):
+                continue
+
             card.region.render()
+            if collided is card:
+                pos: Vector2 = Vector2(card.get_surface_pos().topleft) + Vector2(card.region.placement.topleft)
+                self._parent.surface.blit(card.hover, pos)
 
-        if (collided := self.get_collided()) is not None:
-            pos: Vector2 = Vector2(collided.get_surface_pos().topleft) + Vector2(collided.region.placement.topleft)
-            self._parent.surface.blit(collided.hover, pos)
+            changed.append(card.region.placement.move(self._parent.placement.topleft))
 
-        self._parent.render()
+        self._hovered = collided
+        self.is_dirty = False
+        if changed:
+            self._parent.render()
+
+        return changed
 
     def get_collided(self) -> Optional[ThemeCard]:
-        mouse_pos: Vector2 = Vector2(mouse.get_pos())
-        for card in self._theme_cards:
-            pos: Vector2 = Vector2(self._parent.placement.topleft) + Vector2(card.get_surface_pos().topleft) +\
-                            Vector2(card.region.placement.topleft)
-            if card.surface.get_rect().collidepoint(mouse_pos - pos):
-                return card
-        return None
+        x, y = Pointer.pos
+        x -= self._parent.placement.x
+        y -= self._parent.placement.y
+        if (index := self._card_index.get_cell(x, y)) is None:
+            return None
+
+        card: ThemeCard = self._theme_cards[index[1]]
+        card_rect: Rect = card.get_surface_pos().move(card.region.placement.topleft)
+        return card if card_rect.collidepoint(x, y) else None
 
 
 class TitleComponent:
 
     def __init__(self, parent: Region, theme: AppTheme) -> None:
         self._parent: Region = parent
-        self._draw_title(theme)
+        self._titles: ThemeCache[Surface] = ThemeCache(self._draw_title)
+        self._parent.surface = self._titles.get(theme)
+        self.is_dirty: bool = True
 
-    def _draw_title(self, theme: AppTheme) -> None:
-        font: Font = SysFont(get_fonts()[0], TITLE_FONT_SIZE)
-        title: Surface = font.render(TITLE, True, theme.foreground, theme.background)
-        self._parent.surface.fill(theme.background)
-        self._parent.surface.blit(title, title.get_rect(center=self._parent.surface.get_rect().center))
+    def _draw_title(self, theme: AppTheme) -> Surface:
+        title: Surface = FontRegistry.render(TITLE, TITLE_FONT_SIZE, theme.foreground, theme.background)
+        surface: Surface = Surface(self._parent.surface.get_size())
+        surface.fill(theme.background)
+        surface.blit(title, title.get_rect(center=surface.get_rect().center))
+        return surface
 
     def redraw(self, theme: AppTheme) -> None:
-        self._draw_title(theme)
+        self._parent.surface = self._titles.get(theme)
+        self.is_dirty = True
+
+    def render(self) -> list[Rect]:
+        if not self.is_dirty:
+            return []
 
-    def render(self) -> None:
+        self.is_dirty = False
         self._parent.render()
+        return [self._parent.placement]
 
 
 class MainMenu(Page):
 
     @override
+    @timed("MainMenu.parse_event")
     def parse_event(self, game_event: Event) -> None:
         if game_event.type != MOUSEBUTTONUP:
             return
@@ -181,10 +243,15 @@ class MainMenu(Page):
 
 
     @override
-    def render(self) -> None:
-        self._title_component.render()
-        self._diff_component.render()
-        self._theme_component.render()
+    @timed("MainMenu.render")
+    def render(self) -> list[Rect]:
+        return self._title_component.render() + self._diff_component.render() + self._theme_component.render()
+
+    @override
+    def invalidate(self) -> None:
+        self._title_component.is_dirty = True
+        self._diff_component.is_dirty = True
+        self._theme_component.is_dirty = True
 
     @override
     def update(self, delta_time: float) -> None:
@@ -206,12 +273,18 @@ class MainMenu(Page):
         self._diff_component: DifficultyComponent = DifficultyComponent(diff_area, self._theme)
         self._theme_component: ThemeComponent = ThemeComponent(theme_area, self._theme)
 
+    def enable_difficulty(self, difficulty: PuzzleDifficulty) -> None:
+        self._diff_component.enable(difficulty)
+
     def _handle_diff_press(self) -> None:
         if (diff := self._diff_component.get_collided()) is None:
             return
 
+        if (puzzle := PuzzleStore.get_random_puzzle(diff.difficulty)) is None:
+            return
+
         self.events.put(
-            LaunchGameEvent(diff.difficulty, choice(PuzzleStore.get_puzzles(diff.difficulty)))
+            LaunchGameEvent(diff.difficulty, puzzle)
         )
 
     def _handle_theme_press(self) -> None:
@@ -0,0 +1,113 @@
+import csv
+from array import array
+from collections.abc import Callable
+from functools import wraps
+from math import ceil
+from pathlib import Path
+from time import perf_counter_ns
+from typing import NamedTuple
+
+from config.app_config import PROFILER_ENABLED
+from config.app_config import PROFILER_SAMPLES
+
+
+class SectionStats(NamedTuple):
+    name: str
+    samples: int
+    p50: float
+    p95: float
+    p99: float
+    worst: float
+
+
+class RingBuffer:
+    # holds the last `size` samples, the oldest one is overwritten once it is full
+
+    def __init__(self, size: int = PROFILER_SAMPLES) -> None:
+        self._samples: array[int] = array("q", bytes(8 * size))
+        self._next: int = 0
+        self._count: int = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, sample: int) -> None:
+        self._samples[self._next] = sample
+        self._next = (self._next + 1) % len(self._samples)
+        self._count = min(self._count + 1, len(self._samples))
+
+    def get_sorted(self) -> list[int]:
+        return sorted(self._samples[:self._count])
+
+
+class Profiler:
+    # time spent in named sections, in nanoseconds. sections are registered when they are defined and only
+    # record while the profiler is enabled
+
+    enabled: bool = PROFILER_ENABLED
+    _sections: dict[str, RingBuffer] = {}
+
+    @staticmethod
+    def get_section(name: str) -> RingBuffer:
+        if (section := Profiler._sections.get(name)) is None:
+            section = RingBuffer()
+            Profiler._sections[name] = section
+
+        return section
+
+    @staticmethod
+    def record(name: str, start: int) -> None:
+        Profiler.get_section(name).add(perf_counter_ns() - start)
+
+    @staticmethod
+    def has_samples() -> bool:
+        return any(len(section) > 0 for section in Profiler._sections.values())
+
+    @staticmethod
+    def get_stats() -> list[SectionStats]:
+        stats: list[SectionStats] = []
+        for name, section in Profiler._sections.items():
+            if len(section) == 0:
+                continue
+
+            samples: list[int] = section.get_sorted()
+            stats.append(SectionStats(name, len(samples), get_percentile(samples, 50) / 1_000_000,
+                                      get_percentile(samples, 95) / 1_000_000, get_percentile(samples, 99) / 1_000_000,
+                                      samples[-1] / 1_000_000))
+
+        return stats
+
+    @staticmethod
+    def dump_csv(path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["section", "samples", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+            for stats in Profiler.get_stats():
+                writer.writerow([stats.name, stats.samples, f"{stats.p50:.3f}", f"{stats.p95:.3f}",
+                                 f"{stats.p99:.3f}", f"{stats.worst:.3f}"])
+
+
+def timed[**P, R](name: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    # records every call of the decorated function as section `name`, a disabled profiler costs one flag check
+    def decorate(func: Callable[P, R]) -> Callable[P, R]:
+        section: RingBuffer = Profiler.get_section(name)
+
+        @wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if not Profiler.enabled:
+                return func(*args, **kwargs)
+
+            start: int = perf_counter_ns()
+            result: R = func(*args, **kwargs)
+            section.add(perf_counter_ns() - start)
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+def get_percentile[T](sorted_samples: list[T], percent: int) -> T:
+    # nearest rank, the samples have to be sorted and not empty
+    return sorted_samples[max(ceil(len(sorted_samples) * percent / 100) - 1, 0)]
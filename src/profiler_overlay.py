@@ -0,0 +1,59 @@
+from pygame import display
+from pygame.color import Color
+from pygame.font import Font
+from pygame.rect import Rect
+from pygame.surface import Surface
+
+from config.app_config import PROFILER_FONT_SIZE
+from config.app_config import PROFILER_OVERLAY_INTERVAL
+from fonts import FontRegistry
+from profiler import Profiler
+
+OVERLAY_PAD: int = 6
+OVERLAY_FOREGROUND: Color = Color(255, 255, 255)
+OVERLAY_BACKGROUND: Color = Color(0, 0, 0)
+
+
+class ProfilerOverlay:
+    # frame rate and section timings drawn over the top left corner of whatever page is shown. the text changes
+    # every PROFILER_OVERLAY_INTERVAL seconds and the box only ever grows, so it always covers the last one
+
+    def __init__(self) -> None:
+        self.is_shown: bool = Profiler.enabled
+        self._surface: Surface = Surface((0, 0))
+        self._elapsed: float = PROFILER_OVERLAY_INTERVAL
+
+    def toggle(self) -> None:
+        self.is_shown = not self.is_shown
+        self._elapsed = PROFILER_OVERLAY_INTERVAL
+
+    def render(self, delta_time: float, fps: int) -> list[Rect]:
+        self._elapsed += delta_time
+        if self._elapsed >= PROFILER_OVERLAY_INTERVAL:
+            self._elapsed = 0
+            self._surface = self._draw(fps)
+
+        return [display.get_surface().blit(self._surface, (OVERLAY_PAD, OVERLAY_PAD))]
+
+    def _draw(self, fps: int) -> Surface:
+        # the numbers change all the time, rendering them past the glyph cache keeps it for the game text
+        font: Font = FontRegistry.get_font(PROFILER_FONT_SIZE)
+        column_width: int = font.size("0000.00")[0] + OVERLAY_PAD
+        rows: list[list[str]] = [[f"{fps} fps", "p50", "p95", "p99"]]
+        for stats in Profiler.get_stats():
+            rows.append([stats.name, f"{stats.p50:.2f}", f"{stats.p95:.2f}", f"{stats.p99:.2f}"])
+
+        name_width: int = max(font.size(row[0])[0] for row in rows) + OVERLAY_PAD
+        width: int = max(self._surface.get_width(), name_width + (column_width * 3) + OVERLAY_PAD)
+        height: int = max(self._surface.get_height(), (font.get_linesize() * len(rows)) + (OVERLAY_PAD * 2))
+        surface: Surface = Surface((width, height))
+        surface.fill(OVERLAY_BACKGROUND)
+        for index, row in enumerate(rows):
+            y: int = OVERLAY_PAD + (font.get_linesize() * index)
+            surface.blit(font.render(row[0], True, OVERLAY_FOREGROUND, OVERLAY_BACKGROUND), (OVERLAY_PAD, y))
+            for column, text in enumerate(row[1:]):
+                text_surface: Surface = font.render(text, True, OVERLAY_FOREGROUND, OVERLAY_BACKGROUND)
+                right: int = OVERLAY_PAD + name_width + (column_width * (column + 1))
+                surface.blit(text_surface, text_surface.get_rect(topright=(right, y)))
+
+        return surface
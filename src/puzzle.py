@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from dataclasses import field
+from enum import Enum
+from enum import auto
+from typing import Any
+
+type CellIndex = tuple[int, int]
+type Cage = tuple[int, list[CellIndex]]
+
+CELL_COUNT: int = 81
+NO_CAGE: int = 0xFF
+
+
+class PuzzleDifficulty(Enum):
+    EASY = auto()
+    NORMAL = auto()
+    HARD = auto()
+    EXPERT = auto()
+    MASTER = auto()
+
+
+@dataclass(slots=True, frozen=True)
+class Puzzle:
+    volume: int
+    book: int
+    id: int
+    diff: PuzzleDifficulty
+    cages: list[Cage]
+    # cage index of every cell in row major order, NO_CAGE when a cell is not in any cage
+    cage_map: bytes = field(init=False, repr=False, compare=False)
+    # bit (row * 9 + col) is set for every cell of the cage
+    cage_masks: tuple[int, ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        cage_map: bytearray = bytearray([NO_CAGE]) * CELL_COUNT
+        cage_masks: list[int] = []
+        for cage_index, (_, cells) in enumerate(self.cages):
+            mask: int = 0
+            for row, col in cells:
+                cage_map[(row * 9) + col] = cage_index
+                mask |= 1 << ((row * 9) + col)
+
+            cage_masks.append(mask)
+
+        object.__setattr__(self, "cage_map", bytes(cage_map))
+        object.__setattr__(self, "cage_masks", tuple(cage_masks))
+
+    def get_cage_index(self, row: int, col: int) -> int:
+        return self.cage_map[(row * 9) + col]
+
+
+def parse_puzzle(puzzle_data: dict[str, Any]) -> Puzzle:
+    diff: PuzzleDifficulty = PuzzleDifficulty[puzzle_data["diff"]]
+    cages: list[Cage] = []
+
+    # a record has to describe a whole board, every cell in exactly one cage, before a Puzzle can index it
+    covered: bytearray = bytearray(CELL_COUNT)
+    for cage_sum, cage_cells in puzzle_data["cages"]:
+        cells: list[CellIndex] = []
+        for row, col in cage_cells:
+            row, col = int(row), int(col)
+            if not (0 <= row < 9 and 0 <= col < 9):
+                raise ValueError(f"cage cell ({row}, {col}) is outside the board")
+
+            if covered[(row * 9) + col]:
+                raise ValueError(f"cell ({row}, {col}) is in more than one cage")
+
+            covered[(row * 9) + col] = 1
+            cells.append((row, col))
+
+        if not cells:
+            raise ValueError("cage has no cells")
+
+        if not (1 <= int(cage_sum) <= 45):
+            raise ValueError(f"cage sum {cage_sum} is not between 1 and 45")
+
+        cages.append((int(cage_sum), cells))
+
+    if 0 in covered:
+        raise ValueError("cages do not cover every cell")
+
+    return Puzzle(puzzle_data["volume"], puzzle_data["book"], puzzle_data["id"], diff, cages)
+
+
+def puzzle_to_json(puzzle: Puzzle) -> dict[str, Any]:
+    return {
+        "volume": puzzle.volume,
+        "book": puzzle.book,
+        "id": puzzle.id,
+        "diff": puzzle.diff.name,
+        "cages": [[cage_sum, [[row, col] for row, col in cells]] for cage_sum, cells in puzzle.cages],
+    }
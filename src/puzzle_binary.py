@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import mmap
+import os
+from argparse import ArgumentParser
+from array import array
+from bisect import bisect_left
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from collections.abc import Sequence
+from functools import lru_cache
+from pathlib import Path
+from shutil import copyfileobj
+from struct import Struct
+from tempfile import TemporaryFile
+from typing import Any
+from typing import BinaryIO
+from typing import Optional
+from typing import overload
+
+from config.app_config import BINARY_PUZZLES
+from config.app_config import BOARD_SIZE
+from config.app_config import JSON_PUZZLES
+from config.app_config import PUZZLE_CACHE_SIZE
+from puzzle import Cage
+from puzzle import CellIndex
+from puzzle import Puzzle
+from puzzle import PuzzleDifficulty
+from puzzle_reader import ErrorHandler
+from puzzle_reader import iter_json_puzzles
+from puzzle_reader import report_malformed
+
+# File layout:
+#   header  - magic, version, record size, then (first record, record count) for every difficulty
+#   records - fixed size, grouped by difficulty in PuzzleDifficulty order
+#
+# Record layout:
+#   volume, book, id, difficulty, cage count
+#   cage map    - 81 bytes, cage index of every cell in row major order
+#   cage sums   - 81 bytes, sum of every cage
+#   cage anchor - 81 bytes, cell index of the last cell of every cage (where the cage sum is drawn)
+#
+# Index layout:
+#   header  - magic, version, key count
+#   keys    - sorted (volume, book, id) keys packed into 64 bits
+#   records - corpus record of every key
+
+CORPUS_MAGIC: bytes = b"KSPZ"
+CORPUS_VERSION: int = 1
+INDEX_MAGIC: bytes = b"KSPI"
+INDEX_VERSION: int = 1
+CELL_COUNT: int = BOARD_SIZE * BOARD_SIZE
+
+_HEADER: Struct = Struct(f"<4sHH{len(PuzzleDifficulty) * 2}I")
+_RECORD: Struct = Struct(f"<HHIBB{CELL_COUNT}s{CELL_COUNT}s{CELL_COUNT}s")
+_RECORD_KEY: Struct = Struct("<HHI")
+_INDEX_HEADER: Struct = Struct("<4sHI")
+
+
+class CorpusFormatError(Exception):
+    pass
+
+
+def encode_puzzle(puzzle: Puzzle) -> bytes:
+    if not (0 <= puzzle.volume <= 0xFFFF and 0 <= puzzle.book <= 0xFFFF and 0 <= puzzle.id <= 0xFFFFFFFF):
+        raise CorpusFormatError(f"puzzle {puzzle.volume}-{puzzle.book}-{puzzle.id} does not fit in a record")
+
+    if len(puzzle.cages) > CELL_COUNT:
+        raise CorpusFormatError(f"puzzle {puzzle.volume}-{puzzle.book}-{puzzle.id} has too many cages")
+
+    cage_map: bytearray = bytearray([0xFF] * CELL_COUNT)
+    sums: bytearray = bytearray(CELL_COUNT)
+    anchors: bytearray = bytearray(CELL_COUNT)
+    for cage_index, (cage_sum, cells) in enumerate(puzzle.cages):
+        for row, col in cells:
+            cage_map[(row * BOARD_SIZE) + col] = cage_index
+
+        last_row, last_col = cells[-1]
+        sums[cage_index] = cage_sum
+        anchors[cage_index] = (last_row * BOARD_SIZE) + last_col
+
+    if 0xFF in cage_map:
+        raise CorpusFormatError(f"puzzle {puzzle.volume}-{puzzle.book}-{puzzle.id} does not cover every cell")
+
+    return _RECORD.pack(puzzle.volume, puzzle.book, puzzle.id, puzzle.diff.value, len(puzzle.cages),
+                        bytes(cage_map), bytes(sums), bytes(anchors))
+
+
+def decode_puzzle(buffer: Any, offset: int = 0) -> Puzzle:
+    volume, book, puzzle_id, diff, cage_count, cage_map, sums, anchors = _RECORD.unpack_from(buffer, offset)
+
+    cage_cells: list[list[CellIndex]] = [[] for _ in range(cage_count)]
+    for cell_index, cage_index in enumerate(cage_map):
+        if anchors[cage_index] != cell_index:
+            cage_cells[cage_index].append(divmod(cell_index, BOARD_SIZE))
+
+    cages: list[Cage] = []
+    for cage_index, cells in enumerate(cage_cells):
+        cells.append(divmod(anchors[cage_index], BOARD_SIZE))
+        cages.append((sums[cage_index], cells))
+
+    return Puzzle(volume, book, puzzle_id, PuzzleDifficulty(diff), cages)
+
+
+def write_corpus(puzzles: Iterable[Puzzle], corpus_path: str) -> int:
+    # records are spooled into one temporary shard per difficulty so memory use does not grow with the corpus
+    shards: dict[PuzzleDifficulty, BinaryIO] = {diff: TemporaryFile() for diff in PuzzleDifficulty}
+    counts: dict[PuzzleDifficulty, int] = {diff: 0 for diff in PuzzleDifficulty}
+    try:
+        for puzzle in puzzles:
+            shards[puzzle.diff].write(encode_puzzle(puzzle))
+            counts[puzzle.diff] += 1
+
+        index: list[int] = []
+        first_record: int = 0
+        for diff in PuzzleDifficulty:
+            index.extend((first_record, counts[diff]))
+            first_record += counts[diff]
+
+        partial_path: str = f"{corpus_path}.partial"
+        with open(partial_path, "wb") as file:
+            file.write(_HEADER.pack(CORPUS_MAGIC, CORPUS_VERSION, _RECORD.size, *index))
+            for diff in PuzzleDifficulty:
+                shards[diff].seek(0)
+                copyfileobj(shards[diff], file)
+
+        os.replace(partial_path, corpus_path)
+
+    finally:
+        for shard in shards.values():
+            shard.close()
+
+    return first_record
+
+
+def convert_json(json_path: str, corpus_path: str, on_error: Optional[ErrorHandler] = report_malformed) -> int:
+    return write_corpus(iter_json_puzzles(json_path, on_error), corpus_path)
+
+
+class PuzzleCorpus:
+
+    def __init__(self, corpus_path: str, cache_size: int = PUZZLE_CACHE_SIZE) -> None:
+        self._file: BinaryIO = open(corpus_path, "rb")
+        self._buffer: mmap.mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index: dict[PuzzleDifficulty, tuple[int, int]] = self._read_header()
+        self._decode: Callable[[int], Puzzle] = lru_cache(maxsize=cache_size)(self._decode_record)
+
+    def _read_header(self) -> dict[PuzzleDifficulty, tuple[int, int]]:
+        if len(self._buffer) < _HEADER.size:
+            raise CorpusFormatError("puzzle corpus is truncated")
+
+        magic, version, record_size, *index = _HEADER.unpack_from(self._buffer, 0)
+        if magic != CORPUS_MAGIC:
+            raise CorpusFormatError("file is not a puzzle corpus")
+
+        if version != CORPUS_VERSION or record_size != _RECORD.size:
+            raise CorpusFormatError(f"unsupported puzzle corpus version {version}")
+
+        header_index: dict[PuzzleDifficulty, tuple[int, int]] = {}
+        for diff in PuzzleDifficulty:
+            first_record, count = index[(diff.value - 1) * 2: diff.value * 2]
+            header_index[diff] = (first_record, count)
+
+        last_record: int = max(first + count for first, count in header_index.values())
+        if len(self._buffer) < _HEADER.size + (last_record * _RECORD.size):
+            raise CorpusFormatError("puzzle corpus is truncated")
+
+        return header_index
+
+    def __len__(self) -> int:
+        return sum(count for _, count in self._index.values())
+
+    def count(self, difficulty: PuzzleDifficulty) -> int:
+        return self._index[difficulty][1]
+
+    def get(self, difficulty: PuzzleDifficulty, index: int) -> Puzzle:
+        first_record, count = self._index[difficulty]
+        if not 0 <= index < count:
+            raise IndexError(f"{difficulty.name} puzzle index {index} out of range")
+
+        return self.get_record(first_record + index)
+
+    def get_record(self, record: int) -> Puzzle:
+        return self._decode(record)
+
+    def get_first_record(self, difficulty: PuzzleDifficulty) -> int:
+        return self._index[difficulty][0]
+
+    def iter_puzzles(self) -> Iterator[Puzzle]:
+        # decodes straight from the buffer, a full scan would only churn the lru cache
+        for record in range(len(self)):
+            yield self._decode_record(record)
+
+    def iter_keys(self) -> Iterator[tuple[int, int, int]]:
+        for record in range(len(self)):
+            yield _RECORD_KEY.unpack_from(self._buffer, _HEADER.size + (record * _RECORD.size))
+
+    def _decode_record(self, record: int) -> Puzzle:
+        return decode_puzzle(self._buffer, _HEADER.size + (record * _RECORD.size))
+
+    def view(self, difficulty: PuzzleDifficulty) -> CorpusView:
+        return CorpusView(self, difficulty)
+
+    def close(self) -> None:
+        self._buffer.close()
+        self._file.close()
+
+
+class CorpusView(Sequence[Puzzle]):
+
+    def __init__(self, corpus: PuzzleCorpus, difficulty: PuzzleDifficulty) -> None:
+        self._corpus: PuzzleCorpus = corpus
+        self._difficulty: PuzzleDifficulty = difficulty
+
+    def __len__(self) -> int:
+        return self._corpus.count(self._difficulty)
+
+    @overload
+    def __getitem__(self, index: int) -> Puzzle: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Puzzle]: ...
+
+    def __getitem__(self, index: int | slice) -> Puzzle | list[Puzzle]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+
+        return self._corpus.get(self._difficulty, index)
+
+
+class PuzzleIndex:
+
+    @staticmethod
+    def build(corpus: PuzzleCorpus, index_path: str) -> PuzzleIndex:
+        entries: list[tuple[int, int]] = sorted((_pack_key(*key), record)
+                                                for record, key in enumerate(corpus.iter_keys()))
+        keys: array[int] = array("Q", (key for key, _ in entries))
+        records: array[int] = array("I", (record for _, record in entries))
+
+        with open(index_path, "wb") as file:
+            file.write(_INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(keys)))
+            keys.tofile(file)
+            records.tofile(file)
+
+        return PuzzleIndex(keys, records)
+
+    @staticmethod
+    def load(index_path: str) -> PuzzleIndex:
+        with open(index_path, "rb") as file:
+            magic, version, count = _INDEX_HEADER.unpack(file.read(_INDEX_HEADER.size))
+            if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                raise CorpusFormatError("unsupported puzzle index")
+
+            keys: array[int] = array("Q")
+            records: array[int] = array("I")
+            try:
+                keys.fromfile(file, count)
+                records.fromfile(file, count)
+
+            except EOFError as error:
+                raise CorpusFormatError("puzzle index is truncated") from error
+
+        return PuzzleIndex(keys, records)
+
+    def __init__(self, keys: array[int], records: array[int]) -> None:
+        self._keys: array[int] = keys
+        self._records: array[int] = records
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def find(self, volume: int, book: int, puzzle_id: int) -> Optional[int]:
+        key: int = _pack_key(volume, book, puzzle_id)
+        position: int = bisect_left(self._keys, key)
+        if position == len(self._keys) or self._keys[position] != key:
+            return None
+
+        return self._records[position]
+
+
+def _pack_key(volume: int, book: int, puzzle_id: int) -> int:
+    return (volume << 48) | (book << 32) | puzzle_id
+
+
+if __name__ == "__main__":
+    parser: ArgumentParser = ArgumentParser(description="convert a json puzzle file into a binary puzzle corpus")
+    parser.add_argument("source", nargs="?", default=JSON_PUZZLES)
+    parser.add_argument("destination", nargs="?", default=BINARY_PUZZLES)
+    args = parser.parse_args()
+
+    Path(args.destination).parent.mkdir(parents=True, exist_ok=True)
+    print(f"wrote {convert_json(args.source, args.destination)} puzzles to {args.destination}")
@@ -0,0 +1,255 @@
+import json
+import os
+import sys
+from argparse import ArgumentParser
+from argparse import Namespace
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+from time import perf_counter
+from typing import NamedTuple
+from typing import Optional
+
+from config.app_config import BOARD_SIZE
+from killer_sudoku_solver import CELL_COUNT
+from killer_sudoku_solver import KillerSudokuSolver
+from killer_sudoku_solver import NodeLimitExceeded
+from killer_sudoku_solver import PEERS
+from killer_sudoku_state import Board
+from puzzle import puzzle_to_json
+from puzzle_store import Cage
+from puzzle_store import Puzzle
+from puzzle_rater import rate_puzzle
+from puzzle_store import PuzzleDifficulty
+
+# smallest and largest cage the generator aims for, larger cages give away less and are harder to solve
+DIFFICULTY_CAGE_SIZES: dict[PuzzleDifficulty, tuple[int, int]] = {
+    PuzzleDifficulty.EASY: (1, 3),
+    PuzzleDifficulty.NORMAL: (2, 3),
+    PuzzleDifficulty.HARD: (2, 4),
+    PuzzleDifficulty.EXPERT: (2, 5),
+    PuzzleDifficulty.MASTER: (3, 6),
+}
+MAX_CAGE_MOVES: int = 60
+MAX_SEARCH_NODES: int = 2000
+# layouts generated for one puzzle until the rater agrees with its difficulty, the closest one is kept otherwise
+MAX_RATING_ATTEMPTS: int = 40
+
+
+def _get_orthogonal_neighbours(cell: int) -> tuple[int, ...]:
+    row, col = divmod(cell, BOARD_SIZE)
+    return tuple((r * BOARD_SIZE) + c for r, c in ((row - 1, col), (row + 1, col), (row, col - 1), (row, col + 1))
+                 if 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE)
+
+
+ORTHOGONAL_NEIGHBOURS: tuple[tuple[int, ...], ...] = tuple(_get_orthogonal_neighbours(cell)
+                                                           for cell in range(CELL_COUNT))
+
+
+class GenerationJob(NamedTuple):
+    seed: int
+    index: int
+    difficulty: PuzzleDifficulty
+    volume: int
+    book: int
+
+
+class PuzzleGenerator:
+
+    def __init__(self, rng: Random, difficulty: PuzzleDifficulty) -> None:
+        self._rng: Random = rng
+        self._difficulty: PuzzleDifficulty = difficulty
+        self._min_size, self._max_size = DIFFICULTY_CAGE_SIZES[difficulty]
+
+    def generate(self, volume: int, book: int, puzzle_id: int) -> Puzzle:
+        # the cage sizes only steer the difficulty, the rater decides whether a puzzle needs the techniques of it
+        closest: Optional[tuple[int, Puzzle]] = None
+        for _ in range(MAX_RATING_ATTEMPTS):
+            grid: list[int] = self.create_grid()
+            cages: list[list[int]] = self._make_unique(grid, self._create_cages(grid))
+            puzzle: Puzzle = Puzzle(volume, book, puzzle_id, self._difficulty, self._to_cages(grid, cages))
+            distance: int = abs(rate_puzzle(puzzle).difficulty.value - self._difficulty.value)
+            if distance == 0:
+                return puzzle
+
+            if closest is None or distance < closest[0]:
+                closest = (distance, puzzle)
+
+        assert closest is not None
+        return closest[1]
+
+    def create_grid(self) -> list[int]:
+        grid: list[int] = [0] * CELL_COUNT
+        if not self._fill_grid(grid, 0):
+            raise Exception("failed to create a sudoku grid")
+
+        return grid
+
+    def _fill_grid(self, grid: list[int], cell: int) -> bool:
+        if cell == CELL_COUNT:
+            return True
+
+        used: set[int] = {grid[peer] for peer in PEERS[cell]}
+        digits: list[int] = [digit for digit in range(1, BOARD_SIZE + 1) if digit not in used]
+        self._rng.shuffle(digits)
+        for digit in digits:
+            grid[cell] = digit
+            if self._fill_grid(grid, cell + 1):
+                return True
+
+        grid[cell] = 0
+        return False
+
+    def _create_cages(self, grid: list[int]) -> list[list[int]]:
+        cage_of: list[int] = [-1] * CELL_COUNT
+        cages: list[list[int]] = []
+        order: list[int] = list(range(CELL_COUNT))
+        self._rng.shuffle(order)
+
+        for start in order:
+            if cage_of[start] != -1:
+                continue
+
+            cage: list[int] = [start]
+            digits: set[int] = {grid[start]}
+            cage_of[start] = len(cages)
+            target_size: int = self._rng.randint(self._min_size, self._max_size)
+            while len(cage) < target_size:
+                options: list[int] = [neighbour for cell in cage for neighbour in ORTHOGONAL_NEIGHBOURS[cell]
+                                      if cage_of[neighbour] == -1 and grid[neighbour] not in digits]
+                if not options:
+                    break
+
+                cell: int = self._rng.choice(options)
+                cage.append(cell)
+                digits.add(grid[cell])
+                cage_of[cell] = len(cages)
+
+            cages.append(cage)
+
+        return cages
+
+    def _make_unique(self, grid: list[int], cages: list[list[int]]) -> list[list[int]]:
+        # every step either moves an ambiguous cell into a neighbouring cage or splits it off its own cage,
+        # splitting only ever adds cages so the loop ends with a unique puzzle at the latest once every cage
+        # is a single cell. layouts too loose for the solver to settle quickly get their largest cage split.
+        moves: int = 0
+        while True:
+            solver: KillerSudokuSolver = KillerSudokuSolver(self._to_puzzle(grid, cages))
+            try:
+                solutions: list[Board] = solver.find_solutions(2, MAX_SEARCH_NODES)
+
+            except NodeLimitExceeded:
+                self._split_cell(cages, self._rng.choice(max(cages, key=len)))
+                continue
+
+            if len(solutions) == 1:
+                return cages
+
+            alternative: Board = next(solution for solution in solutions if solution != self._to_board(grid))
+            ambiguous: list[int] = [cell for cell in range(CELL_COUNT)
+                                    if alternative[cell // BOARD_SIZE][cell % BOARD_SIZE] != grid[cell]]
+            cell: int = self._rng.choice(ambiguous)
+
+            if moves < MAX_CAGE_MOVES and self._move_cell(grid, cages, cell):
+                moves += 1
+                continue
+
+            self._split_cell(cages, cell)
+
+    def _move_cell(self, grid: list[int], cages: list[list[int]], cell: int) -> bool:
+        source: list[int] = next(cage for cage in cages if cell in cage)
+        targets: list[list[int]] = []
+        for neighbour in ORTHOGONAL_NEIGHBOURS[cell]:
+            target: list[int] = next(cage for cage in cages if neighbour in cage)
+            if target is source or target in targets or len(target) >= self._max_size:
+                continue
+
+            if grid[cell] in (grid[target_cell] for target_cell in target):
+                continue
+
+            targets.append(target)
+
+        if not targets:
+            return False
+
+        self._split_cell(cages, cell)
+        cages.remove([cell])
+        self._rng.choice(targets).append(cell)
+        return True
+
+    @staticmethod
+    def _split_cell(cages: list[list[int]], cell: int) -> None:
+        source: list[int] = next(cage for cage in cages if cell in cage)
+        cages.remove(source)
+        remaining: set[int] = set(source) - {cell}
+        cages.append([cell])
+
+        while remaining:
+            component: list[int] = [remaining.pop()]
+            for component_cell in component:
+                for neighbour in ORTHOGONAL_NEIGHBOURS[component_cell]:
+                    if neighbour in remaining:
+                        remaining.remove(neighbour)
+                        component.append(neighbour)
+
+            cages.append(component)
+
+    @staticmethod
+    def _to_cages(grid: list[int], cages: list[list[int]]) -> list[Cage]:
+        # the cage sum is drawn on the last cell, so the top left cell of every cage goes last
+        return [(sum(grid[cell] for cell in cage), [divmod(cell, BOARD_SIZE) for cell in sorted(cage, reverse=True)])
+                for cage in sorted(cages, key=min)]
+
+    def _to_puzzle(self, grid: list[int], cages: list[list[int]]) -> Puzzle:
+        return Puzzle(0, 0, 0, self._difficulty, self._to_cages(grid, cages))
+
+    @staticmethod
+    def _to_board(grid: list[int]) -> Board:
+        return [grid[row * BOARD_SIZE:(row + 1) * BOARD_SIZE] for row in range(BOARD_SIZE)]
+
+
+def generate_puzzle(job: GenerationJob) -> Puzzle:
+    # seeding from the job index keeps the output identical whatever the number of workers
+    generator: PuzzleGenerator = PuzzleGenerator(Random(f"{job.seed}-{job.index}"), job.difficulty)
+    return generator.generate(job.volume, job.book, job.index + 1)
+
+
+def generate_puzzles(count: int, difficulty: PuzzleDifficulty, seed: int, workers: Optional[int] = None,
+                     volume: int = 0, book: int = 0) -> Iterator[Puzzle]:
+    jobs: list[GenerationJob] = [GenerationJob(seed, index, difficulty, volume, book) for index in range(count)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(generate_puzzle, jobs, chunksize=max(1, count // ((workers or 1) * 8)))
+
+
+def parse_args() -> Namespace:
+    parser: ArgumentParser = ArgumentParser(description="generate killer sudoku puzzles with a unique solution")
+    parser.add_argument("output", help="json file the puzzles are written to, in the same format as puzzles.json")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--difficulty", choices=[diff.name for diff in PuzzleDifficulty],
+                        default=PuzzleDifficulty.NORMAL.name)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--volume", type=int, default=0)
+    parser.add_argument("--book", type=int, default=0)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args: Namespace = parse_args()
+    start: float = perf_counter()
+    with open(args.output, "w") as file:
+        file.write("[")
+        for index, puzzle in enumerate(generate_puzzles(args.count, PuzzleDifficulty[args.difficulty], args.seed,
+                                                        args.workers, args.volume, args.book)):
+            file.write(("," if index > 0 else "") + "\n" + json.dumps(puzzle_to_json(puzzle)))
+
+        file.write("\n]\n")
+
+    seconds: float = perf_counter() - start
+    print(f"generated {args.count} puzzles in {seconds:.2f}s with {args.workers} workers")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+import json
+import os
+import sys
+from argparse import ArgumentParser
+from argparse import Namespace
+from collections import Counter
+from collections.abc import Callable
+from enum import Enum
+from enum import auto
+from itertools import combinations
+from time import perf_counter
+from typing import Any
+from typing import NamedTuple
+from typing import Optional
+
+from cage_combinations import ALL_DIGITS
+from cage_combinations import MAX_CAGE_SUM
+from chunk_runner import iter_chunks
+from chunk_runner import map_chunks
+from chunk_runner import positive_int
+from config.app_config import BOARD_SIZE
+from killer_sudoku_solver import BIT_COUNT
+from killer_sudoku_solver import CELL_COUNT
+from killer_sudoku_solver import CageOptions
+from killer_sudoku_solver import MASK_BITS
+from killer_sudoku_solver import PEERS
+from killer_sudoku_solver import SumConstraint
+from killer_sudoku_solver import UNITS
+from killer_sudoku_solver import get_cage_options
+from killer_sudoku_solver import get_innies
+from puzzle_store import Puzzle
+from puzzle_store import PuzzleDifficulty
+from puzzle_store import PuzzleStore
+
+DEFAULT_CHUNK_SIZE: int = 32
+DEFAULT_OUTPUT: str = "data/ratings.jsonl"
+
+
+class Technique(Enum):
+    CAGE_COMBINATIONS = auto()
+    NAKED_SINGLE = auto()
+    HIDDEN_SINGLE = auto()
+    RULE_45 = auto()
+    NAKED_PAIR = auto()
+    HIDDEN_PAIR = auto()
+    CAGE_ELIMINATION = auto()
+    GUESS = auto()
+
+
+# rating cost of one application of a technique
+TECHNIQUE_WEIGHTS: dict[Technique, int] = {
+    Technique.CAGE_COMBINATIONS: 1,
+    Technique.NAKED_SINGLE: 1,
+    Technique.HIDDEN_SINGLE: 2,
+    Technique.RULE_45: 3,
+    Technique.NAKED_PAIR: 4,
+    Technique.HIDDEN_PAIR: 5,
+    Technique.CAGE_ELIMINATION: 6,
+    Technique.GUESS: 20,
+}
+
+# the hardest technique a puzzle needs decides its bucket
+TECHNIQUE_DIFFICULTY: dict[Technique, PuzzleDifficulty] = {
+    Technique.CAGE_COMBINATIONS: PuzzleDifficulty.EASY,
+    Technique.NAKED_SINGLE: PuzzleDifficulty.EASY,
+    Technique.HIDDEN_SINGLE: PuzzleDifficulty.EASY,
+    Technique.RULE_45: PuzzleDifficulty.NORMAL,
+    Technique.NAKED_PAIR: PuzzleDifficulty.HARD,
+    Technique.HIDDEN_PAIR: PuzzleDifficulty.HARD,
+    Technique.CAGE_ELIMINATION: PuzzleDifficulty.EXPERT,
+    Technique.GUESS: PuzzleDifficulty.MASTER,
+}
+
+
+class Contradiction(Exception):
+    pass
+
+
+class Rating(NamedTuple):
+    solved: bool
+    log: list[Technique]
+    rating: int
+    hardest: Optional[Technique]
+
+    @property
+    def difficulty(self) -> PuzzleDifficulty:
+        if self.hardest is None:
+            return PuzzleDifficulty.EASY
+
+        return TECHNIQUE_DIFFICULTY[self.hardest]
+
+
+class PuzzleRater:
+
+    def __init__(self, puzzle: Puzzle) -> None:
+        self._cages: list[SumConstraint] = [
+            (cage_sum, tuple((row * BOARD_SIZE) + col for row, col in cells)) for cage_sum, cells in puzzle.cages
+        ]
+        self._rule_45: list[SumConstraint] = get_innies(self._cages) + self._get_outies()
+
+        cage_peers: list[set[int]] = [set(peers) for peers in PEERS]
+        for _, cells in self._cages:
+            for cell in cells:
+                cage_peers[cell].update(peer for peer in cells if peer != cell)
+
+        self._peers: tuple[frozenset[int], ...] = tuple(frozenset(peers) for peers in cage_peers)
+        self._candidates: list[int] = [ALL_DIGITS] * CELL_COUNT
+        self._techniques: list[tuple[Technique, Callable[[], bool]]] = [
+            (Technique.CAGE_COMBINATIONS, lambda: self._apply_sums(self._cages)),
+            (Technique.NAKED_SINGLE, self._apply_naked_singles),
+            (Technique.HIDDEN_SINGLE, self._apply_hidden_singles),
+            (Technique.RULE_45, lambda: self._apply_sums(self._rule_45)),
+            (Technique.NAKED_PAIR, self._apply_naked_pairs),
+            (Technique.HIDDEN_PAIR, self._apply_hidden_pairs),
+            (Technique.CAGE_ELIMINATION, self._apply_cage_elimination),
+        ]
+
+    def rate(self) -> Rating:
+        # techniques are tried easiest first, the first one that makes progress is logged and the list starts over
+        log: list[Technique] = []
+        try:
+            while not self._is_solved():
+                for technique, apply in self._techniques:
+                    if apply():
+                        log.append(technique)
+                        break
+
+                else:
+                    log.append(Technique.GUESS)
+                    break
+
+        except Contradiction:
+            # the puzzle has no solution, it is rated on the techniques that got it there and is not solved
+            pass
+
+        hardest: Optional[Technique] = max(log, default=None, key=lambda technique: (
+            TECHNIQUE_DIFFICULTY[technique].value, TECHNIQUE_WEIGHTS[technique]))
+        rating: int = sum(TECHNIQUE_WEIGHTS[technique] for technique in log)
+        if log and log[-1] is Technique.GUESS:
+            rating += TECHNIQUE_WEIGHTS[Technique.GUESS] * self._count_unsolved()
+
+        return Rating(self._is_solved(), log, rating, hardest)
+
+    def _get_outies(self) -> list[SumConstraint]:
+        # 45 rule, the cells that cages overlapping a unit have outside of it add up to those cages minus 45.
+        # only usable as a sum constraint when all of those cells are different digits
+        outies: list[SumConstraint] = []
+        for unit in UNITS:
+            unit_cells: set[int] = set(unit)
+            outside: set[int] = set()
+            total: int = 0
+            for cage_sum, cells in self._cages:
+                if unit_cells.isdisjoint(cells):
+                    continue
+
+                total += cage_sum
+                outside.update(cell for cell in cells if cell not in unit_cells)
+
+            if not 0 < len(outside) < BOARD_SIZE or total - MAX_CAGE_SUM <= 0:
+                continue
+
+            if all(other in PEERS[cell] for cell, other in combinations(outside, 2)):
+                outies.append((total - MAX_CAGE_SUM, tuple(sorted(outside))))
+
+        return outies
+
+    def _is_solved(self) -> bool:
+        return all(BIT_COUNT[mask] == 1 for mask in self._candidates)
+
+    def _count_unsolved(self) -> int:
+        return sum(1 for mask in self._candidates if BIT_COUNT[mask] != 1)
+
+    def _restrict(self, cell: int, allowed: int) -> bool:
+        mask: int = self._candidates[cell]
+        if mask & allowed == mask:
+            return False
+
+        if mask & allowed == 0:
+            raise Contradiction(f"cell {cell} has no candidates left")
+
+        self._candidates[cell] = mask & allowed
+        return True
+
+    def _get_options(self, cage_sum: int, cells: tuple[int, ...]) -> CageOptions:
+        if (options := get_cage_options(cage_sum, cells, self._candidates)) is None:
+            raise Contradiction(f"cells {cells} cannot add up to {cage_sum}")
+
+        return options
+
+    def _apply_sums(self, constraints: list[SumConstraint]) -> bool:
+        changed: bool = False
+        for cage_sum, cells in constraints:
+            options: CageOptions = self._get_options(cage_sum, cells)
+            for cell in options.unsolved:
+                changed |= self._restrict(cell, options.union)
+
+        return changed
+
+    def _apply_naked_singles(self) -> bool:
+        changed: bool = False
+        for cell, mask in enumerate(self._candidates):
+            if BIT_COUNT[mask] != 1:
+                continue
+
+            for peer in self._peers[cell]:
+                changed |= self._restrict(peer, ALL_DIGITS ^ mask)
+
+        return changed
+
+    def _apply_hidden_singles(self) -> bool:
+        for unit in UNITS:
+            for bit in MASK_BITS[ALL_DIGITS]:
+                cells: list[int] = [cell for cell in unit if self._candidates[cell] & bit]
+                if len(cells) == 1 and self._restrict(cells[0], bit):
+                    return True
+
+        return False
+
+    def _apply_naked_pairs(self) -> bool:
+        changed: bool = False
+        for unit in UNITS:
+            pairs: Counter[int] = Counter(self._candidates[cell] for cell in unit
+                                          if BIT_COUNT[self._candidates[cell]] == 2)
+            for pair, count in pairs.items():
+                if count != 2:
+                    continue
+
+                for cell in unit:
+                    if self._candidates[cell] != pair:
+                        changed |= self._restrict(cell, ALL_DIGITS ^ pair)
+
+        return changed
+
+    def _apply_hidden_pairs(self) -> bool:
+        changed: bool = False
+        for unit in UNITS:
+            positions: dict[int, tuple[int, ...]] = {
+                bit: tuple(cell for cell in unit if self._candidates[cell] & bit) for bit in MASK_BITS[ALL_DIGITS]
+            }
+            for first, second in combinations(MASK_BITS[ALL_DIGITS], 2):
+                if len(positions[first]) == 2 and positions[first] == positions[second]:
+                    for cell in positions[first]:
+                        changed |= self._restrict(cell, first | second)
+
+        return changed
+
+    def _apply_cage_elimination(self) -> bool:
+        # a digit every valid combination of a cage contains has to go in one of the cage cells that can still
+        # hold it, so cells outside the cage that see all of those cells cannot hold it
+        changed: bool = False
+        for cage_sum, cells in self._cages:
+            options: CageOptions = self._get_options(cage_sum, cells)
+            for bit in MASK_BITS[options.required]:
+                holders: list[int] = [cell for cell in options.unsolved if self._candidates[cell] & bit]
+                if not holders:
+                    continue
+
+                seen_by_all: frozenset[int] = PEERS[holders[0]].intersection(*(PEERS[cell] for cell in holders[1:]))
+                for cell in seen_by_all.difference(cells):
+                    changed |= self._restrict(cell, ALL_DIGITS ^ bit)
+
+        return changed
+
+
+def rate_puzzle(puzzle: Puzzle) -> Rating:
+    return PuzzleRater(puzzle).rate()
+
+
+def rate_chunk(puzzles: tuple[Puzzle, ...]) -> list[dict[str, Any]]:
+    results: list[dict[str, Any]] = []
+    for puzzle in puzzles:
+        rating: Rating = rate_puzzle(puzzle)
+        results.append({
+            "volume": puzzle.volume,
+            "book": puzzle.book,
+            "id": puzzle.id,
+            "diff": puzzle.diff.name,
+            "rated_diff": rating.difficulty.name,
+            "rating": rating.rating,
+            "solved": rating.solved,
+            "techniques": {technique.name: count for technique, count in Counter(rating.log).items()},
+        })
+
+    return results
+
+
+def parse_args() -> Namespace:
+    parser: ArgumentParser = ArgumentParser(description="rate every puzzle in the store by the techniques it needs")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="json lines file the ratings are written to")
+    parser.add_argument("--workers", type=positive_int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=positive_int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--limit", type=int, default=None, help="only rate the first LIMIT puzzles")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args: Namespace = parse_args()
+    PuzzleStore.load_puzzles()
+
+    buckets: Counter[tuple[str, str]] = Counter()
+    start: float = perf_counter()
+    with open(args.output, "w") as file:
+        for results in map_chunks(rate_chunk, iter_chunks(args.limit, args.chunk_size), args.workers):
+            for result in results:
+                file.write(json.dumps(result) + "\n")
+                buckets[(result["diff"], result["rated_diff"])] += 1
+
+            file.flush()
+
+    seconds: float = perf_counter() - start
+    total: int = buckets.total()
+    print(f"rated {total} puzzles in {seconds:.2f}s, {total / seconds if seconds > 0 else 0:.1f} puzzles/s")
+    print("labelled".ljust(10) + "".join(diff.name.ljust(10) for diff in PuzzleDifficulty))
+    for labelled in PuzzleDifficulty:
+        print(labelled.name.ljust(10) + "".join(str(buckets[(labelled.name, rated.name)]).ljust(10)
+                                                for rated in PuzzleDifficulty))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
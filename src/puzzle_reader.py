@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import sys
+from collections.abc import Callable
+from collections.abc import Iterator
+from typing import Any
+from typing import Optional
+from typing import TextIO
+
+from puzzle import Puzzle
+from puzzle import parse_puzzle
+
+READ_CHUNK_SIZE: int = 1 << 16
+MAX_RECORD_SIZE: int = 1 << 20
+WHITESPACE: str = " \t\r\n"
+
+type ErrorHandler = Callable[[MalformedPuzzleError], None]
+
+
+class MalformedPuzzleError(Exception):
+
+    def __init__(self, record: int, reason: str) -> None:
+        super().__init__(f"puzzle record {record}: {reason}")
+        self.record: int = record
+        self.reason: str = reason
+
+
+def report_malformed(error: MalformedPuzzleError) -> None:
+    print(f"skipping {error}", file=sys.stderr)
+
+
+def iter_json_puzzles(json_path: str, on_error: Optional[ErrorHandler] = report_malformed) -> Iterator[Puzzle]:
+    for record, puzzle_data in enumerate(iter_json_array(json_path)):
+        if isinstance(puzzle_data, MalformedPuzzleError):
+            if on_error is not None:
+                on_error(puzzle_data)
+            return
+
+        try:
+            yield parse_puzzle(puzzle_data)
+
+        except (KeyError, ValueError, TypeError) as error:
+            if on_error is not None:
+                on_error(MalformedPuzzleError(record, f"{type(error).__name__}: {error}"))
+
+
+def iter_json_array(json_path: str) -> Iterator[Any | MalformedPuzzleError]:
+    # yields the elements of a top level json array one at a time, the file is never held in memory as a whole.
+    # a syntax error cannot be recovered from, so it is yielded as the last item.
+    with open(json_path, "r") as file:
+        reader: JsonArrayReader = JsonArrayReader(file)
+        if reader.skip(WHITESPACE) != "[":
+            yield MalformedPuzzleError(0, "puzzle file is not a json array")
+            return
+
+        reader.pos += 1
+        record: int = 0
+        while True:
+            next_char: Optional[str] = reader.skip(WHITESPACE + ",")
+            if next_char is None:
+                yield MalformedPuzzleError(record, "unexpected end of file")
+                return
+
+            if next_char == "]":
+                return
+
+            try:
+                yield reader.decode()
+
+            except json.JSONDecodeError as error:
+                yield MalformedPuzzleError(record, error.msg)
+                return
+
+            record += 1
+
+
+class JsonArrayReader:
+
+    def __init__(self, file: TextIO) -> None:
+        self._file: TextIO = file
+        self._decoder: json.JSONDecoder = json.JSONDecoder()
+        self._buffer: str = ""
+        self._is_eof: bool = False
+        self.pos: int = 0
+
+    def skip(self, separators: str) -> Optional[str]:
+        while True:
+            while self.pos < len(self._buffer) and self._buffer[self.pos] in separators:
+                self.pos += 1
+
+            if self.pos < len(self._buffer):
+                return self._buffer[self.pos]
+
+            if not self._fill():
+                return None
+
+    def decode(self) -> Any:
+        while True:
+            try:
+                value, self.pos = self._decoder.raw_decode(self._buffer, self.pos)
+                return value
+
+            except json.JSONDecodeError:
+                if len(self._buffer) - self.pos > MAX_RECORD_SIZE or not self._fill():
+                    raise
+
+    def _fill(self) -> bool:
+        if self._is_eof:
+            return False
+
+        if not (chunk := self._file.read(READ_CHUNK_SIZE)):
+            self._is_eof = True
+            return False
+
+        self._buffer = self._buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
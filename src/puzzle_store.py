@@ -1,57 +1,108 @@
 from __future__ import annotations
 
-import json
-from dataclasses import dataclass
-from enum import Enum
-from enum import auto
-
+from collections.abc import Callable
+from collections.abc import Iterator
+from collections.abc import Sequence
+from pathlib import Path
+from random import randrange
+from typing import Optional
+
+from config.app_config import BINARY_PUZZLES
 from config.app_config import JSON_PUZZLES
+from config.app_config import PUZZLE_INDEX
+from puzzle import Cage
+from puzzle import CellIndex
+from puzzle import Puzzle
+from puzzle import PuzzleDifficulty
+from puzzle_binary import CorpusFormatError
+from puzzle_binary import PuzzleCorpus
+from puzzle_binary import PuzzleIndex
+from puzzle_binary import convert_json
 
-type CellIndex = tuple[int, int]
-type Cage = tuple[int, list[CellIndex]]
 
+class PuzzleStore:
+    _corpus: Optional[PuzzleCorpus] = None
+    _index: Optional[PuzzleIndex] = None
 
-class PuzzleDifficulty(Enum):
-    EASY = auto()
-    NORMAL = auto()
-    HARD = auto()
-    EXPERT = auto()
-    MASTER = auto()
+    @staticmethod
+    def get_puzzles(difficulty: PuzzleDifficulty) -> Sequence[Puzzle]:
+        if PuzzleStore._corpus is None:
+            return []
 
+        return PuzzleStore._corpus.view(difficulty)
 
-@dataclass(slots=True, frozen=True)
-class Puzzle:
-    volume: int
-    book: int
-    id: int
-    diff: PuzzleDifficulty
-    cages: list[Cage]
+    @staticmethod
+    def get_puzzle_count(difficulty: PuzzleDifficulty) -> int:
+        if PuzzleStore._corpus is None:
+            return 0
 
+        return PuzzleStore._corpus.count(difficulty)
 
-class PuzzleStore:
-    _store: dict[PuzzleDifficulty, list[Puzzle]] = {}
+    @staticmethod
+    def get_random_puzzle(difficulty: PuzzleDifficulty) -> Optional[Puzzle]:
+        if (count := PuzzleStore.get_puzzle_count(difficulty)) == 0:
+            return None
+
+        assert PuzzleStore._corpus is not None
+        return PuzzleStore._corpus.get(difficulty, randrange(count))
 
     @staticmethod
-    def get_puzzles(difficulty: PuzzleDifficulty) -> list[Puzzle]:
-        return PuzzleStore._store.get(difficulty, [])
+    def iter_puzzles() -> Iterator[Puzzle]:
+        if PuzzleStore._corpus is None:
+            return iter(())
+
+        return PuzzleStore._corpus.iter_puzzles()
 
     @staticmethod
-    def load_puzzles() -> None:
-        with open(JSON_PUZZLES, "r") as file:
-            for puzzle_data in json.load(file):
-                diff: PuzzleDifficulty = PuzzleDifficulty[puzzle_data["diff"]]
-                cages: list[Cage] = []
+    def get_puzzle(volume: int, book: int, puzzle_id: int) -> Optional[Puzzle]:
+        if PuzzleStore._corpus is None or PuzzleStore._index is None:
+            return None
+
+        if (record := PuzzleStore._index.find(volume, book, puzzle_id)) is None:
+            return None
+
+        return PuzzleStore._corpus.get_record(record)
+
+    @staticmethod
+    def load_puzzles(on_ready: Optional[Callable[[PuzzleDifficulty], None]] = None) -> None:
+        if is_stale(BINARY_PUZZLES, JSON_PUZZLES):
+            convert_json(JSON_PUZZLES, BINARY_PUZZLES)
+
+        if PuzzleStore._corpus is not None:
+            PuzzleStore._corpus.close()
+
+        corpus: PuzzleCorpus = PuzzleCorpus(BINARY_PUZZLES)
+        PuzzleStore._index = None
+        PuzzleStore._corpus = corpus
+
+        if on_ready is not None:
+            for diff in PuzzleDifficulty:
+                if corpus.count(diff) > 0:
+                    on_ready(diff)
+
+        PuzzleStore._index = PuzzleStore._load_index(corpus)
+
+    @staticmethod
+    def _load_index(corpus: PuzzleCorpus) -> PuzzleIndex:
+        if not is_stale(PUZZLE_INDEX, BINARY_PUZZLES):
+            try:
+                index: PuzzleIndex = PuzzleIndex.load(PUZZLE_INDEX)
+                if len(index) == len(corpus):
+                    return index
+
+            except CorpusFormatError:
+                pass
 
-                for cage_sum, cage_cells in puzzle_data["cages"]:
-                    cells: list[tuple[int, int]] = []
-                    for row, col in cage_cells:
-                        cells.append((int(row), int(col)))
+        return PuzzleIndex.build(corpus, PUZZLE_INDEX)
 
-                    cages.append((int(cage_sum), cells))
 
-                puzzle: Puzzle = Puzzle(puzzle_data["volume"], puzzle_data["book"], puzzle_data["id"], diff, cages)
+def is_stale(target: str, source: str) -> bool:
+    target_path: Path = Path(target)
+    source_path: Path = Path(source)
+    if not target_path.exists():
+        return True
 
-                if diff not in PuzzleStore._store:
-                    PuzzleStore._store[diff] = []
+    if not source_path.exists():
+        return False
 
-                PuzzleStore._store[diff].append(puzzle)
+    return target_path.stat().st_mtime < source_path.stat().st_mtime
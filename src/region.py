@@ -4,13 +4,13 @@ from enum import Enum
 from enum import auto
 from typing import Optional
 
-from pygame import mouse
 from pygame.color import Color
 from pygame.math import Vector2
 from pygame.rect import Rect
 from pygame.surface import Surface
 
 from config.app_config import HOVER_ALPHA
+from layout import Pointer
 
 
 class PartitionDirection(Enum):
@@ -19,6 +19,9 @@ class PartitionDirection(Enum):
 
 
 class Region:
+    # hover surfaces only depend on their size and color, regions of the same size share them
+    _hover_surfaces: dict[tuple[tuple[int, int], tuple[int, int, int, int]], Surface] = {}
+
     @staticmethod
     def partition(parent: Surface, direction: PartitionDirection, *weights: int) -> list[Region]:
         # Works best when weights divides parents height with no remainder
@@ -90,12 +93,18 @@ class Region:
         self._parent.blit(self._surface, self._placement)
 
     def is_collided(self, parent_placement: Vector2) -> bool:
-        mouse_pos: Vector2 = Vector2(mouse.get_pos()) - parent_placement
-        return self._placement.collidepoint(*mouse_pos.xy)
+        x, y = Pointer.pos
+        return self._placement.collidepoint(x - parent_placement.x, y - parent_placement.y)
 
     def set_hover_color(self, color: Color) -> None:
-        self._hover.fill(color)
-        self._hover.set_alpha(HOVER_ALPHA)
+        key: tuple[tuple[int, int], tuple[int, int, int, int]] = (self._hover.get_size(), tuple(color))
+        if (hover := Region._hover_surfaces.get(key)) is None:
+            hover = Surface(key[0])
+            hover.fill(color)
+            hover.set_alpha(HOVER_ALPHA)
+            Region._hover_surfaces[key] = hover
+
+        self._hover = hover
 
     def render_hover(self) -> None:
         self._parent.blit(self._hover, self._placement)
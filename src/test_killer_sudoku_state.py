@@ -0,0 +1,114 @@
+import unittest
+from random import Random
+from typing import Optional
+
+from killer_sudoku_solver import SolveResult
+from killer_sudoku_solver import solve_puzzle
+from killer_sudoku_state import Delete
+from killer_sudoku_state import KillerSudokuState
+from killer_sudoku_state import Place
+from killer_sudoku_state import get_sudoku_neighbours
+from puzzle import PuzzleDifficulty
+from puzzle_generator import GenerationJob
+from puzzle_generator import generate_puzzle
+from puzzle_store import Puzzle
+
+STEPS: int = 2000
+SEEDS: int = 3
+
+
+def is_value_valid(board: list[list[int]], row: int, col: int) -> bool:
+    value: int = board[row][col]
+    return value == 0 or all(board[r][c] != value for r, c in get_sudoku_neighbours(row, col) if (r, c) != (row, col))
+
+
+def is_mark_valid(board: list[list[int]], mark: int, row: int, col: int) -> bool:
+    return all(board[r][c] != mark for r, c in get_sudoku_neighbours(row, col))
+
+
+def is_cage_valid(board: list[list[int]], cage_sum: int, cage_cells: list[tuple[int, int]]) -> bool:
+    current_sum: int = sum(board[row][col] for row, col in cage_cells)
+    if all(board[row][col] != 0 for row, col in cage_cells):
+        return current_sum == cage_sum
+
+    return current_sum < cage_sum
+
+
+def is_puzzle_solved(board: list[list[int]], puzzle: Puzzle) -> bool:
+    return all(is_value_valid(board, row, col) and board[row][col] != 0 for row in range(9) for col in range(9)) \
+        and all(is_cage_valid(board, cage_sum, cage_cells) for cage_sum, cage_cells in puzzle.cages)
+
+
+class TestIncrementalCounters(unittest.TestCase):
+    # the counters the state keeps up to date on every change against checks that look at the whole board
+
+    def test_random_moves(self) -> None:
+        for seed in range(SEEDS):
+            with self.subTest(seed=seed):
+                self._run_random_moves(seed)
+
+    def test_solved_board(self) -> None:
+        state, solution = self._create_game(0)
+        for row in range(9):
+            for col in range(9):
+                state.process_move(Place([(row, col)], solution[row][col], False))
+
+        self.assertTrue(state.is_puzzle_solved())
+        state.undo_move()
+        self.assertFalse(state.is_puzzle_solved())
+        state.redo_move()
+        self.assertTrue(state.is_puzzle_solved())
+
+    def _run_random_moves(self, seed: int) -> None:
+        state, solution = self._create_game(seed)
+        rng: Random = Random(seed)
+        for step in range(STEPS):
+            cells: list[tuple[int, int]] = [(rng.randrange(9), rng.randrange(9)) for _ in range(rng.randint(1, 3))]
+            kind: float = rng.random()
+            if kind < 0.5:
+                # mostly the solution value, so boards close to solved and solved cages come up as well
+                row, col = cells[0]
+                value: int = solution[row][col] if rng.random() < 0.7 else rng.randint(1, 9)
+                state.process_move(Place(cells, value, rng.random() < 0.3))
+
+            elif kind < 0.65:
+                state.process_move(Delete(cells))
+
+            elif kind < 0.85:
+                state.undo_move()
+
+            else:
+                state.redo_move()
+
+            self._assert_counters(state, step)
+
+    def _assert_counters(self, state: KillerSudokuState, step: int) -> None:
+        board: list[list[int]] = state.get_state()
+        for row in range(9):
+            for col in range(9):
+                self.assertEqual(state.is_value_valid(row, col), is_value_valid(board, row, col),
+                                 f"value ({row}, {col}) at step {step}")
+                for mark in state.get_pencil_markings(row, col):
+                    self.assertEqual(state.is_mark_valid(mark, row, col), is_mark_valid(board, mark, row, col),
+                                     f"mark {mark} ({row}, {col}) at step {step}")
+
+        for cage_index, (cage_sum, cage_cells) in enumerate(state.puzzle.cages):
+            self.assertEqual(state.is_cage_index_valid(cage_index), is_cage_valid(board, cage_sum, cage_cells),
+                             f"cage {cage_cells} at step {step}")
+
+        self.assertEqual(state.is_puzzle_solved(), is_puzzle_solved(board, state.puzzle), f"solved at step {step}")
+
+    @staticmethod
+    def _create_game(seed: int) -> tuple[KillerSudokuState, list[list[int]]]:
+        puzzle: Puzzle = generate_puzzle(GenerationJob(seed, 0, PuzzleDifficulty.EASY, 0, 0))
+        result: SolveResult = solve_puzzle(puzzle)
+        solution: Optional[list[list[int]]] = result.solution
+        assert solution is not None
+
+        state: KillerSudokuState = KillerSudokuState()
+        state.puzzle = puzzle
+        return state, solution
+
+
+if __name__ == "__main__":
+    unittest.main()
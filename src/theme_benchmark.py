@@ -0,0 +1,105 @@
+import os
+import sys
+from argparse import ArgumentParser
+from argparse import Namespace
+from contextlib import chdir
+from queue import Queue
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import NamedTuple
+from typing import Optional
+
+import pygame
+
+from asset import AssetManager
+from config.app_config import APP_HEIGHT
+from config.app_config import APP_WIDTH
+from config.app_config import KILLER_SUDOKU_PAGE
+from config.app_config import MAIN_MENU_PAGE
+from events import AppEvent
+from page import Page
+from page import PageManager
+from page_killer_sudoku import KillerSudoku
+from page_main_menu import MainMenu
+from themes import AppTheme
+from themes import ThemeKey
+from themes import Themes
+
+DEFAULT_ROUNDS: int = 50
+
+
+class ThemeTiming(NamedTuple):
+    name: str
+    first: Optional[float]
+    median: float
+    worst: float
+
+
+def switch_theme(pages: PageManager, theme: AppTheme) -> float:
+    # the same work the app does for a ChangeThemeEvent, up to the frame showing the new theme
+    start: float = perf_counter()
+    pages.update_pages_theme(theme)
+    page: Optional[Page] = pages.page
+    assert page is not None
+    page.display()
+    return perf_counter() - start
+
+
+def run_benchmark(rounds: int) -> list[ThemeTiming]:
+    pygame.init()
+    pygame.display.set_mode((APP_WIDTH, APP_HEIGHT))
+    AssetManager.load_icons()
+
+    # the killer sudoku page opens the game journal in the working directory, building the pages in an empty one
+    # keeps the benchmark away from a saved game
+    timings: dict[str, list[float]] = {name: [] for name in Themes.themes}
+    with TemporaryDirectory() as directory, chdir(directory):
+        pages: PageManager = PageManager(Queue[AppEvent]())
+        pages.add_page(MAIN_MENU_PAGE, MainMenu, AppTheme.default())
+        pages.add_page(KILLER_SUDOKU_PAGE, KillerSudoku, AppTheme.default())
+        pages.page = MAIN_MENU_PAGE
+
+        for _ in range(rounds):
+            for name, theme in Themes.themes.items():
+                timings[name].append(switch_theme(pages, theme))
+
+        killer_sudoku: Optional[Page] = pages.get_page(KILLER_SUDOKU_PAGE)
+        assert isinstance(killer_sudoku, KillerSudoku)
+        killer_sudoku.close()
+
+    pygame.quit()
+    # the first switch builds the cached surfaces, the median and worst only cover the switches after it. the pages
+    # are built with the default theme, so its first switch is not a cold one and is left out
+    default_key: ThemeKey = AppTheme.default().key
+    return [ThemeTiming(name, None if Themes.themes[name].key == default_key else times[0], median(times[1:]),
+                        max(times[1:])) for name, times in timings.items()]
+
+
+def parse_args() -> Namespace:
+    parser: ArgumentParser = ArgumentParser(description="time switching between every theme from the main menu")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="times every theme is switched to")
+    parser.add_argument("--headless", action="store_true", help="render without opening a window")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args: Namespace = parse_args()
+    if args.rounds < 2:
+        print("--rounds must be at least 2, the first switch to a theme is reported on its own", file=sys.stderr)
+        return 1
+
+    if args.headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+    # the first switch to a theme builds what it needs, the switches after it use what was built
+    for timing in run_benchmark(args.rounds):
+        first: str = "built with the pages" if timing.first is None else f"{timing.first * 1000:.2f} ms"
+        print(f"{timing.name}: first {first}, median {timing.median * 1000:.2f} ms, "
+              f"worst {timing.worst * 1000:.2f} ms")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections.abc import Callable
 from typing import NamedTuple
 
 from pygame.color import Color
@@ -9,6 +10,8 @@ from config.app_config import DARK_THEME
 from config.app_config import LIGHT2_THEME
 from config.app_config import LIGHT_THEME
 
+type ThemeKey = tuple[tuple[int, int, int, int], ...]
+
 
 class AppTheme(NamedTuple):
 
@@ -21,6 +24,29 @@ class AppTheme(NamedTuple):
     invalid: Color
     background: Color
 
+    @property
+    def key(self) -> ThemeKey:
+        # colors cannot be hashed, the key stands in for the theme in dicts
+        return tuple(tuple(color) for color in self)
+
+
+class ThemeCache[T]:
+    # whatever is built for a theme is kept, going back to a theme that was shown before is a lookup
+
+    def __init__(self, build: Callable[[AppTheme], T]) -> None:
+        self._build: Callable[[AppTheme], T] = build
+        self._values: dict[ThemeKey, T] = {}
+
+    def get(self, theme: AppTheme) -> T:
+        if (value := self._values.get(key := theme.key)) is None:
+            value = self._build(theme)
+            self._values[key] = value
+
+        return value
+
+    def clear(self) -> None:
+        self._values.clear()
+
 
 class Themes:
     themes: dict[str, AppTheme] = {